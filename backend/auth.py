@@ -1,53 +1,184 @@
 import os
+import time
+import hashlib
+import logging
 import httpx
+import jwt
 from fastapi import HTTPException, Depends, Header
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from ttl_cache import TTLCache
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")  # e.g. https://xyz.supabase.co
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")  # legacy HS256 project secret
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+JWKS_CACHE_TTL_SECONDS = float(os.getenv("JWKS_CACHE_TTL_SECONDS", "600"))
+
+# token hash -> user dict
+_user_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS, name="auth_tokens")
+_http_client: Optional[httpx.AsyncClient] = None
+_jwks: Optional[jwt.PyJWKSet] = None
+_jwks_fetched_at = float("-inf")
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Shared pooled client for calls to Supabase Auth"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            base_url=f"{SUPABASE_URL}/auth/v1",
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _http_client
+
+
+async def close_auth_client():
+    """Close the shared Supabase Auth client"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _get_jwks(force_refresh: bool = False) -> Optional[jwt.PyJWKSet]:
+    """Fetch the project's JWKS, cached in memory for JWKS_CACHE_TTL_SECONDS"""
+    global _jwks, _jwks_fetched_at
+    now = time.monotonic()
+    age = now - _jwks_fetched_at
+    # Forced refreshes (unknown kid) are limited so bogus tokens can't hammer the endpoint
+    if age < (30.0 if force_refresh else JWKS_CACHE_TTL_SECONDS):
+        return _jwks
+
+    try:
+        resp = await _get_http_client().get("/.well-known/jwks.json")
+        if resp.status_code == 200 and resp.json().get("keys"):
+            _jwks = jwt.PyJWKSet.from_dict(resp.json())
+    except Exception as e:
+        logging.warning(f"Failed to fetch JWKS: {e}")
+    _jwks_fetched_at = now
+    return _jwks
+
+
+async def _get_signing_key(token: str):
+    """(key, algorithm) to verify this token locally, or None if it can only be checked remotely"""
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    alg = header.get("alg")
+    if alg == "HS256":
+        return (SUPABASE_JWT_SECRET, alg) if SUPABASE_JWT_SECRET else None
+    if alg not in ("RS256", "ES256") or not SUPABASE_URL:
+        return None
+
+    kid = header.get("kid")
+    jwks = await _get_jwks()
+    if jwks is None or not kid:
+        return None
+    for key in jwks.keys:
+        if key.key_id == kid:
+            return key.key, alg
+    # Key may have been rotated since we cached the set
+    jwks = await _get_jwks(force_refresh=True)
+    for key in (jwks.keys if jwks else []):
+        if key.key_id == kid:
+            return key.key, alg
+    return None
+
+
+async def _verify_locally(token: str) -> Optional[Dict[str, Any]]:
+    """Verify signature, expiry and audience locally; None means fall back to the remote check"""
+    signing_key = await _get_signing_key(token)
+    if signing_key is None:
+        return None
+
+    key, algorithm = signing_key
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=SUPABASE_JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]}
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+
+
+async def _fetch_user_remotely(token: str) -> Dict[str, Any]:
+    """Ask Supabase Auth for the user behind this token"""
+    try:
+        resp = await _get_http_client().get(
+            "/user",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "apikey": os.getenv("SUPABASE_ANON_KEY", "")
+            }
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=401, detail=f"Auth service error: {str(e)}")
+
+    if resp.status_code != 200:
+        logging.error(f"Auth failed with status {resp.status_code}")
+        raise HTTPException(status_code=401, detail=f"Invalid token (status: {resp.status_code})")
+
+    return resp.json()
+
 
 async def get_user_from_token(token: str) -> Dict[str, Any]:
     """Return user dict or raise HTTPException(401)."""
-    if not SUPABASE_URL:
+    # With only SUPABASE_JWT_SECRET set (offline/local backends) HS256 tokens are verified locally
+    if not SUPABASE_URL and not SUPABASE_JWT_SECRET:
         raise HTTPException(status_code=503, detail="Authentication not configured. Please set SUPABASE_URL environment variable.")
-    
+
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": os.getenv("SUPABASE_ANON_KEY", "")
-                }
-            )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=401, detail=f"Auth service error: {str(e)}")
-    
-    if resp.status_code != 200:
-        print(f"❌ Auth failed with status {resp.status_code}: {resp.text}")
-        raise HTTPException(status_code=401, detail=f"Invalid token (status: {resp.status_code})")
-    
-    user_data = resp.json()
-    print(f"✅ Auth successful for user: {user_data.get('id', 'unknown')}")
+    cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    user_data = _user_cache.get(cache_key)
+    if user_data is not None:
+        return user_data
+
+    claims = await _verify_locally(token)
+    if claims is not None:
+        user_data = {
+            "id": claims["sub"],
+            "email": claims.get("email", ""),
+            "role": claims.get("role"),
+            "user_metadata": claims.get("user_metadata", {}),
+            "app_metadata": claims.get("app_metadata", {})
+        }
+        # Never cache past the token's own expiry
+        ttl = min(AUTH_CACHE_TTL_SECONDS, claims["exp"] - time.time())
+    elif not SUPABASE_URL:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    else:
+        user_data = await _fetch_user_remotely(token)
+        ttl = AUTH_CACHE_TTL_SECONDS
+        logging.info(f"Auth successful for user: {user_data.get('id', 'unknown')}")
+
+    _user_cache.set(cache_key, user_data, ttl)
     return user_data
 
 async def get_current_user(authorization: str = Header(None)) -> Dict[str, Any]:
     """Get current user from Authorization header"""
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
-    
+
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization header format")
-    
+
     token = authorization.split(" ")[1]
-    print(f"🔑 Received token: {token[:20]}..." if token else "No token")
     user_data = await get_user_from_token(token)
-    
+
     # Extract user ID from the response
     user_id = user_data.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid user data")
-    
+
     return {"id": user_id, "sub": user_id}
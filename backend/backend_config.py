@@ -0,0 +1,44 @@
+"""
+Selects the storage and database backends from configuration.
+
+STORAGE_BACKEND=supabase|local and DATABASE_BACKEND=supabase|postgres|sqlite;
+the local/sqlite pair runs the whole stack without Supabase.
+"""
+import os
+import logging
+from dotenv import load_dotenv
+from backends import StorageBackend, DatabaseBackend
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase").lower()
+
+
+def create_storage_backend() -> StorageBackend:
+    if STORAGE_BACKEND == "local":
+        from local_storage import LocalStorageManager
+        return LocalStorageManager()
+    if STORAGE_BACKEND != "supabase":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    from storage import SupabaseStorageManager
+    return SupabaseStorageManager()
+
+
+def create_database_backend() -> DatabaseBackend:
+    if DATABASE_BACKEND == "sqlite":
+        from database_sqlite import SQLiteDatabaseManager
+        return SQLiteDatabaseManager()
+    if DATABASE_BACKEND == "postgres":
+        from database_postgres import PostgresDatabaseManager
+        return PostgresDatabaseManager()
+    if DATABASE_BACKEND != "supabase":
+        raise ValueError(f"Unknown DATABASE_BACKEND: {DATABASE_BACKEND}")
+    from database_supabase_api import SupabaseDatabaseManager
+    return SupabaseDatabaseManager()
+
+
+# Global instances
+storage_manager = create_storage_backend()
+db_manager = create_database_backend()
+logging.info(f"Backends: storage={STORAGE_BACKEND}, database={DATABASE_BACKEND}")
@@ -0,0 +1,277 @@
+"""
+Storage and database backend interfaces shared by the Supabase and local implementations
+"""
+import os
+import re
+import json
+import uuid
+import base64
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple, Set, Callable, Awaitable
+from ttl_cache import TTLCache
+
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "5000"))
+
+# Unreferenced objects older than this are deleted by storage_gc.py
+STORAGE_GC_GRACE_SECONDS = float(os.getenv("STORAGE_GC_GRACE_SECONDS", "3600"))
+
+# Columns returned by the resume history endpoint
+RESUME_HISTORY_COLUMNS = 'id,resume_id,job_url,status,storage_url,created_at'
+
+# Content-addressed objects are named <sha256 hex>.pdf
+CONTENT_OBJECT_RE = re.compile(r'^[0-9a-f]{64}\.pdf$')
+
+
+def render_content_hash(html: str, pdf_options: Dict[str, Any], renderer_version: str) -> str:
+    """SHA-256 of everything a PDF render depends on, used as its object name.
+
+    Chromium stamps CreationDate/ModDate into every PDF, so the output bytes of
+    two identical renders differ; the inputs (final HTML, which already contains
+    the template, plus the PDF options and renderer version) do not.
+    """
+    digest = hashlib.sha256()
+    digest.update(renderer_version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(json.dumps(pdf_options, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(html.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def encode_resume_cursor(created_at: str, row_id: str) -> str:
+    """Opaque keyset cursor pointing just after (created_at, id)"""
+    raw = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_resume_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_resume_cursor; raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Both values are interpolated into a PostgREST filter, so only accept timestamp/UUID shapes
+    if not isinstance(created_at, str) or not re.fullmatch(r'[0-9T:.+\- Z]{10,40}', created_at):
+        raise ValueError("Invalid cursor")
+    try:
+        row_id = str(uuid.UUID(str(row_id)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+
+def profile_etag(profile: Any) -> str:
+    """Strong ETag for a profile JSON document"""
+    canonical = json.dumps(profile, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return '"' + hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+class StorageBackend(ABC):
+    """Where rendered PDFs live"""
+
+    @property
+    @abstractmethod
+    def is_configured(self) -> bool:
+        ...
+
+    def get_object_path(self, user_id: str, object_name: str) -> str:
+        """Path of a user's PDF: user_id/<content hash or legacy resume_id>.pdf"""
+        return f"{user_id}/{object_name}.pdf"
+
+    @abstractmethod
+    def get_public_url(self, file_path: str) -> str:
+        ...
+
+    @abstractmethod
+    async def object_age(self, file_path: str) -> Optional[float]:
+        """Seconds since the object was last written, or None if it is missing or unknown"""
+
+    async def object_reusable(self, file_path: str) -> bool:
+        """Whether an existing object can be referenced instead of uploading it again.
+
+        Objects past half the GC grace window count as missing: uploading them
+        again refreshes their age, so GC cannot delete them before the new
+        reference is saved.
+        """
+        age = await self.object_age(file_path)
+        return age is not None and age < STORAGE_GC_GRACE_SECONDS / 2
+
+    @abstractmethod
+    async def upload_pdf(self, pdf_bytes: bytes, user_id: str, object_name: str) -> Optional[str]:
+        """Store a PDF and return its public URL, or None on failure"""
+
+    async def delete_pdf(self, user_id: str, object_name: str) -> bool:
+        return await self.delete_pdfs(user_id, [object_name])
+
+    @abstractmethod
+    async def delete_pdfs(self, user_id: str, object_names: List[str]) -> bool:
+        ...
+
+    @abstractmethod
+    async def list_user_pdfs(self, user_id: str, limit: int = 100, offset: int = 0) -> list:
+        """One page of a user's objects as dicts with at least name and created_at"""
+
+    async def collect_garbage(
+        self,
+        user_id: str,
+        get_referenced_hashes: Callable[[], Awaitable[Set[str]]],
+        grace_seconds: float = STORAGE_GC_GRACE_SECONDS
+    ) -> int:
+        """Delete a user's content-addressed PDFs that no resume references.
+
+        Objects written less than grace_seconds ago are kept so uploads whose
+        metadata has not been saved yet are never collected. References and
+        age are checked again right before each delete, since requests keep
+        running while the listing is processed. Legacy user_id/resume_id.pdf
+        objects are left alone. Returns the number deleted.
+        """
+        now = datetime.now(timezone.utc)
+        referenced_hashes = await get_referenced_hashes()
+        candidates = []
+        offset = 0
+        page_size = 100
+        while True:
+            page = await self.list_user_pdfs(user_id, limit=page_size, offset=offset)
+            for obj in page:
+                name = obj.get("name", "")
+                if not CONTENT_OBJECT_RE.match(name) or name[:-4] in referenced_hashes:
+                    continue
+                # Re-uploads refresh updated_at, not created_at
+                written_at = obj.get("updated_at") or obj.get("created_at")
+                try:
+                    age = (now - datetime.fromisoformat(written_at.replace("Z", "+00:00"))).total_seconds()
+                except (AttributeError, ValueError):
+                    continue
+                if age >= grace_seconds:
+                    candidates.append(name[:-4])
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+        deleted = 0
+        for content_hash in candidates:
+            if content_hash in await get_referenced_hashes():
+                continue
+            age = await self.object_age(self.get_object_path(user_id, content_hash))
+            if age is None or age < grace_seconds:
+                continue
+            if await self.delete_pdf(user_id, content_hash):
+                deleted += 1
+        return deleted
+
+    async def close(self):
+        """Release connections held by the backend"""
+
+
+class DatabaseBackend(ABC):
+    """Where profiles and resume metadata live.
+
+    Profile reads go through a per-user read-through cache that
+    upsert_profile() invalidates. Other worker processes write to the same
+    database, so a cached row is only served while its version still matches
+    the database; subclasses implement the _row and _version methods.
+    """
+
+    def __init__(self):
+        # user_id -> (profile row, etag); invalidated on upsert
+        self.profile_cache = TTLCache(PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL_SECONDS, name="profiles")
+
+    @property
+    @abstractmethod
+    def is_configured(self) -> bool:
+        ...
+
+    async def init_pool(self):
+        """Open connections (called once at startup)"""
+
+    async def close_pool(self):
+        """Close connections (called once at shutdown)"""
+
+    async def upsert_profile(self, user_id: str, profile_data: Dict[str, Any], role_family: str = None):
+        """Insert or update a user's profile in one write"""
+        result = await self._upsert_profile_row(user_id, profile_data, role_family)
+        self.profile_cache.pop(user_id)
+        return result
+
+    async def patch_profile(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Apply a JSON merge patch (RFC 7396) to a profile inside the database.
+
+        Returns the updated row, or None when the profile does not exist or its
+        version no longer equals expected_version.
+        """
+        profile_row = await self._patch_profile_row(user_id, patch, expected_version)
+        self.profile_cache.pop(user_id)
+        if profile_row:
+            self.profile_cache.set(user_id, (profile_row, profile_etag(profile_row.get('profile', {}))))
+        return profile_row
+
+    async def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user profile row (read-through cached)"""
+        profile_row, _ = await self.get_profile_with_etag(user_id)
+        return profile_row
+
+    async def get_profile_with_etag(self, user_id: str, fresh: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Get user profile row and the ETag of its profile JSON.
+
+        Served from cache while the cached version is current (a one-column
+        lookup instead of the full row); fresh=True always reads the row.
+        """
+        cached = None if fresh else self.profile_cache.get(user_id)
+        if cached is not None and await self._fetch_profile_version(user_id) == cached[0].get('version'):
+            return cached
+
+        profile_row = await self._fetch_profile_row(user_id)
+        if not profile_row:
+            self.profile_cache.pop(user_id)
+            return None, None
+        entry = (profile_row, profile_etag(profile_row.get('profile', {})))
+        self.profile_cache.set(user_id, entry)
+        return entry
+
+    @abstractmethod
+    async def _upsert_profile_row(self, user_id: str, profile_data: Dict[str, Any], role_family: Optional[str]):
+        ...
+
+    @abstractmethod
+    async def _patch_profile_row(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def _fetch_profile_row(self, user_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def _fetch_profile_version(self, user_id: str) -> Optional[int]:
+        """Current version of a profile, bumped by every write (None if missing)"""
+
+    @abstractmethod
+    async def save_resume_metadata(self, user_id: str, resume_id: str, job_url: str = None, storage_url: str = None, content_hash: str = None):
+        ...
+
+    @abstractmethod
+    async def update_resume_storage_url(self, user_id: str, resume_id: str, storage_url: str):
+        ...
+
+    @abstractmethod
+    async def get_user_resumes(self, user_id: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def list_resumes_page(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of a user's resumes, newest first, keyset-paginated on (created_at, id)"""
+
+    @abstractmethod
+    async def get_referenced_content_hashes(self, user_id: str) -> set:
+        ...
+
+    @abstractmethod
+    async def list_user_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def delete_resume(self, user_id: str, resume_id: str) -> bool:
+        ...
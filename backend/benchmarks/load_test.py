@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the FastAPI app with external services stubbed out.
+
+The app is driven in-process through httpx's ASGI transport, so the full
+request path (middlewares, auth, pipeline stages, executor, upload spool,
+database) runs for real while:
+
+- the LLM is replaced by a fake agent that returns recorded markdown from
+  benchmarks/corpus after an injectable latency,
+- auth uses locally signed HS256 tokens (no Supabase Auth),
+- storage and database use the local filesystem / SQLite backends in a
+  temporary directory,
+- the Chromium renderer is faked too unless --real-renderer is given.
+
+Latency specs: ``0``, ``fixed:S``, ``uniform:LO,HI``, ``normal:MEAN,SD``
+or ``lognormal:MEDIAN,SIGMA`` (seconds).
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py --concurrency 20 --duration 30
+    python benchmarks/load_test.py --mix resume_agent=6,pdf_from_markdown=3,get_profile=1 \\
+        --llm-latency lognormal:3,0.4 --render-latency uniform:0.2,0.6
+    python benchmarks/load_test.py --real-renderer --requests 200 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parser_harness import load_corpus
+
+JWT_SECRET = "load-test-secret"
+JOB_DESCRIPTION = (
+    "We are hiring a senior engineer to design, build and operate scalable backend services, "
+    "mentor teammates and own production reliability for a fast-growing product."
+)
+# Smallest well-formed PDF, returned by the fake renderer
+FAKE_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Turn a latency spec into a sampler returning seconds"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind in ("0", "none"):
+        return lambda: 0.0
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise argparse.ArgumentTypeError(f"Invalid latency spec: {spec}")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'resume_agent=6,get_profile=1' -> relative weights per scenario"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def configure_environment(workdir: str, args: argparse.Namespace):
+    """Point every backend at local stand-ins; must run before the app is imported"""
+    os.environ.update({
+        "STORAGE_BACKEND": "local",
+        "DATABASE_BACKEND": "sqlite",
+        "LOCAL_STORAGE_DIR": os.path.join(workdir, "storage"),
+        "SQLITE_DATABASE_PATH": os.path.join(workdir, "local.db"),
+        "UPLOAD_SPOOL_DIR": os.path.join(workdir, "spool"),
+        "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.db"),
+        "IDEMPOTENCY_DB_PATH": os.path.join(workdir, "idempotency.db"),
+        "SUPABASE_URL": "",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "LOG_LEVEL": args.log_level,
+    })
+
+
+def make_token(user_id: str) -> str:
+    import jwt
+    return jwt.encode(
+        {"sub": user_id, "email": f"{user_id}@load.test", "aud": "authenticated", "exp": int(time.time()) + 86400},
+        JWT_SECRET,
+        algorithm="HS256"
+    )
+
+
+def install_fakes(documents: List[Dict[str, Any]], llm_latency: Callable[[], float],
+                  render_latency: Callable[[], float], real_renderer: bool):
+    """Replace the LLM (and optionally the browser) with latency-injecting fakes"""
+    import main
+    import pipeline
+    from html_pdf_generator import html_pdf_generator
+
+    async def fake_run_agent(profile_json, job_description, model=None):
+        await asyncio.sleep(llm_latency())
+        return random.choice(documents)["markdown"]
+
+    async def fake_run_agent_stream(profile_json, job_description, model=None):
+        markdown = random.choice(documents)["markdown"]
+        chunks = [markdown[i:i + 64] for i in range(0, len(markdown), 64)]
+        delay = llm_latency() / max(len(chunks), 1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+    async def fake_generate_pdf_from_html(html_content, user_id, options=None):
+        await asyncio.sleep(render_latency())
+        return FAKE_PDF
+
+    pipeline.run_agent = fake_run_agent
+    main.run_agent_stream = fake_run_agent_stream
+    if not real_renderer:
+        html_pdf_generator.generate_pdf_from_html = fake_generate_pdf_from_html
+
+
+def profile_for(doc: Dict[str, Any], full_name: str = "Load User") -> Dict[str, Any]:
+    """The document's profile, or a minimal one for corpus documents that ship without one
+    (the generation endpoints reject an empty profile with 400)"""
+    return doc["profile"] or {"personal_info": {"full_name": full_name}}
+
+
+# Scenario name -> (route label, builder(document) -> (method, path, json body))
+SCENARIOS: Dict[str, Tuple[str, Callable[[Dict[str, Any]], Tuple[str, str, Optional[dict]]]]] = {
+    "resume_agent": ("POST /generate-resume-agent/", lambda doc: (
+        "POST", "/generate-resume-agent/", {"profile": profile_for(doc), "job_description": JOB_DESCRIPTION})),
+    "resume_agent_stream": ("POST /generate-resume-agent/stream", lambda doc: (
+        "POST", "/generate-resume-agent/stream", {"profile": profile_for(doc), "job_description": JOB_DESCRIPTION})),
+    "pdf_from_markdown": ("POST /pdf-from-markdown/", lambda doc: (
+        "POST", "/pdf-from-markdown/", {"markdown": doc["markdown"], "profile": profile_for(doc)})),
+    "preview_html": ("POST /preview-html/", lambda doc: (
+        "POST", "/preview-html/", {"markdown": doc["markdown"], "profile": profile_for(doc)})),
+    "get_profile": ("GET /profile", lambda doc: ("GET", "/profile", None)),
+    "list_resumes": ("GET /resumes", lambda doc: ("GET", "/resumes", None)),
+}
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def record(self, route: str, seconds: float, status: str, ok: bool):
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+        if not ok:
+            self.errors[route] += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(results: Results, elapsed: float) -> Dict[str, Any]:
+    report = {"elapsed_seconds": round(elapsed, 3), "endpoints": {}}
+    routes = sorted(results.latencies)
+    all_latencies = []
+    for route in routes:
+        values = sorted(results.latencies[route])
+        all_latencies.extend(values)
+        report["endpoints"][route] = _summary_row(values, results.errors[route], elapsed, dict(results.statuses[route]))
+    report["total"] = _summary_row(sorted(all_latencies), sum(results.errors.values()), elapsed, None)
+    return report
+
+
+def _summary_row(values: List[float], errors: int, elapsed: float, statuses: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    count = len(values)
+    row = {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+    }
+    if statuses is not None:
+        row["statuses"] = statuses
+    return row
+
+
+def print_report(report: Dict[str, Any]):
+    header = f"{'endpoint':<36} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(f"\n⏱️  {report['elapsed_seconds']}s")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for route, row in rows:
+        print(f"{route:<36} {row['requests']:>7} {row['throughput_rps']:>8.2f} {row['error_rate'] * 100:>6.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    for route, row in report["endpoints"].items():
+        failed = {status: n for status, n in row["statuses"].items() if not status.startswith("2")}
+        if failed:
+            print(f"❌ {route}: {failed}")
+
+
+async def send(client, scenario: str, doc: Dict[str, Any], token: str, results: Results):
+    route, build = SCENARIOS[scenario]
+    method, path, body = build(doc)
+    started = time.perf_counter()
+    try:
+        async with client.stream(method, path, json=body, headers={"Authorization": f"Bearer {token}"}) as response:
+            payload = await response.aread()
+            status = str(response.status_code)
+            ok = response.status_code < 400
+            # Streaming endpoints report failures in the final NDJSON line
+            if ok and response.headers.get("content-type", "").startswith("application/x-ndjson"):
+                lines = payload.decode("utf-8").strip().splitlines()
+                ok = bool(lines) and "error" not in json.loads(lines[-1])
+                status = status if ok else f"{status} (stream error)"
+    except Exception as e:
+        status, ok = type(e).__name__, False
+    results.record(route, time.perf_counter() - started, status, ok)
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from main import app
+
+    documents = load_corpus()
+    install_fakes(documents, args.llm_latency, args.render_latency, args.real_renderer)
+
+    scenarios = list(args.mix)
+    weights = [args.mix[name] for name in scenarios]
+    tokens = [make_token(f"load-user-{i}") for i in range(args.users)]
+    results = Results()
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load.test", timeout=args.timeout) as client:
+            # Every user needs a profile for GET /profile
+            for i, token in enumerate(tokens):
+                doc = documents[i % len(documents)]
+                await client.post("/upsert-profile/", json={"profile": profile_for(doc, f"Load User {i}")},
+                                  headers={"Authorization": f"Bearer {token}"})
+
+            deadline = time.perf_counter() + args.duration if args.duration else None
+            remaining = [args.requests]
+
+            def take() -> bool:
+                if deadline is not None:
+                    return time.perf_counter() < deadline
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+                return True
+
+            async def virtual_user(index: int):
+                token = tokens[index % len(tokens)]
+                while take():
+                    scenario = random.choices(scenarios, weights)[0]
+                    await send(client, scenario, random.choice(documents), token, results)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(virtual_user(i) for i in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    return summarize(results, elapsed)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API with stubbed LLM, auth, storage and renderer")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run (overrides --requests)")
+    parser.add_argument("--requests", type=int, default=200, help="total requests when no --duration is given")
+    parser.add_argument("--users", type=int, default=10, help="distinct authenticated users")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("resume_agent=5,pdf_from_markdown=3,get_profile=2"),
+                        help=f"weighted scenarios: {', '.join(SCENARIOS)}")
+    parser.add_argument("--llm-latency", type=parse_latency, default=parse_latency("lognormal:2,0.5"),
+                        help="fake LLM latency spec")
+    parser.add_argument("--render-latency", type=parse_latency, default=parse_latency("uniform:0.1,0.3"),
+                        help="fake renderer latency spec (ignored with --real-renderer)")
+    parser.add_argument("--real-renderer", action="store_true", help="render PDFs with the real Playwright browser")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request client timeout in seconds")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible mixes and latencies")
+    parser.add_argument("--log-level", default="WARNING", help="app LOG_LEVEL during the run")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary storage/database directory")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    workdir = tempfile.mkdtemp(prefix="cv-load-test-")
+    configure_environment(workdir, args)
+    try:
+        report = asyncio.run(run_load(args))
+    finally:
+        if args.keep:
+            print(f"📁 Test data kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Golden-output regression and throughput harness for FlexibleResumeProcessor.
+
+Every ``corpus/<name>.md`` is a recorded LLM markdown output and
+``corpus/<name>.expected.json`` is its expected structured result. An
+optional ``corpus/<name>.profile.json`` is passed as profile data. Each
+document is also fed through StreamingResumeProcessor in small chunks, which
+must produce the same result. Expected files and parser output both go
+through the StructuredResume JSON schema, so drift in either fails the run.
+
+Usage (from the backend directory):
+    python benchmarks/parser_harness.py               # check outputs + measure throughput
+    python benchmarks/parser_harness.py --update      # re-record expected outputs
+    python benchmarks/parser_harness.py --iterations 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flexible_resume_processor import FlexibleResumeProcessor, StreamingResumeProcessor
+from resume_model import StructuredResume
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def load_corpus() -> List[Dict[str, Any]]:
+    """Load every markdown document in the corpus with its profile and expected output"""
+    documents = []
+    for filename in sorted(os.listdir(CORPUS_DIR)):
+        if not filename.endswith(".md"):
+            continue
+        name = filename[:-3]
+        with open(os.path.join(CORPUS_DIR, filename), "r", encoding="utf-8") as f:
+            markdown = f.read()
+
+        profile = {}
+        profile_path = os.path.join(CORPUS_DIR, f"{name}.profile.json")
+        if os.path.exists(profile_path):
+            with open(profile_path, "r", encoding="utf-8") as f:
+                profile = json.load(f)
+
+        expected = None
+        expected_path = os.path.join(CORPUS_DIR, f"{name}.expected.json")
+        if os.path.exists(expected_path):
+            with open(expected_path, "r", encoding="utf-8") as f:
+                try:
+                    expected = StructuredResume.from_json(f.read()).to_context()
+                except ValueError as e:
+                    raise ValueError(f"{expected_path}: {e}") from e
+
+        documents.append({
+            "name": name,
+            "markdown": markdown,
+            "profile": profile,
+            "expected": expected,
+            "expected_path": expected_path
+        })
+    return documents
+
+
+def diff(expected: Any, actual: Any, path: str = "") -> List[str]:
+    """Return human-readable differences between two JSON-like values"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            child = f"{path}.{key}" if path else str(key)
+            if key not in actual:
+                differences.append(f"{child}: missing (expected {json.dumps(expected[key], ensure_ascii=False)})")
+            elif key not in expected:
+                differences.append(f"{child}: unexpected {json.dumps(actual[key], ensure_ascii=False)}")
+            else:
+                differences.extend(diff(expected[key], actual[key], child))
+        return differences
+
+    if isinstance(expected, list) and isinstance(actual, list):
+        differences = []
+        if len(expected) != len(actual):
+            differences.append(f"{path}: expected {len(expected)} items, got {len(actual)}")
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            differences.extend(diff(e, a, f"{path}[{i}]"))
+        return differences
+
+    if expected != actual:
+        return [f"{path}: expected {json.dumps(expected, ensure_ascii=False)}, got {json.dumps(actual, ensure_ascii=False)}"]
+    return []
+
+
+def parse_streaming(markdown: str, profile: Dict[str, Any], chunk_size: int = 16) -> Dict[str, Any]:
+    """Parse markdown through the incremental processor in fixed-size chunks"""
+    processor = StreamingResumeProcessor(profile)
+    for i in range(0, len(markdown), chunk_size):
+        processor.feed(markdown[i:i + chunk_size])
+    _, resume = processor.finish()
+    return resume.to_context()
+
+
+def check_outputs(documents: List[Dict[str, Any]], update: bool) -> int:
+    """Compare each document's output with its golden file; return the number of failures"""
+    failures = 0
+    for doc in documents:
+        resume = FlexibleResumeProcessor().process_resume(doc["markdown"], doc["profile"])
+        # Round-trip through the schema so output the model can't represent is caught here
+        actual = StructuredResume.from_json(resume.to_json()).to_context()
+
+        if update or doc["expected"] is None:
+            with open(doc["expected_path"], "w", encoding="utf-8") as f:
+                json.dump(actual, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            print(f"📝 {doc['name']}: expected output recorded")
+            continue
+
+        differences = diff(doc["expected"], actual)
+        differences.extend(f"streaming: {line}" for line in diff(actual, parse_streaming(doc["markdown"], doc["profile"])))
+        if differences:
+            failures += 1
+            print(f"❌ {doc['name']}: {len(differences)} difference(s)")
+            for line in differences:
+                print(f"    {line}")
+        else:
+            print(f"✅ {doc['name']}")
+    return failures
+
+
+def measure_throughput(documents: List[Dict[str, Any]], iterations: int) -> float:
+    """Parse the whole corpus repeatedly and return documents per second"""
+    processor = FlexibleResumeProcessor()
+    # Warm up the regex cache
+    for doc in documents:
+        processor.process_resume(doc["markdown"], doc["profile"])
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for doc in documents:
+            processor.process_resume(doc["markdown"], doc["profile"])
+    elapsed = time.perf_counter() - started
+
+    parsed = iterations * len(documents)
+    docs_per_second = parsed / elapsed if elapsed else float("inf")
+    print(f"⏱️  {parsed} documents in {elapsed:.3f}s: {docs_per_second:,.0f} docs/s "
+          f"({elapsed / parsed * 1000:.3f} ms/doc)")
+    return docs_per_second
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Golden-output and throughput harness for the markdown parser")
+    parser.add_argument("--update", action="store_true", help="re-record expected outputs from the current parser")
+    parser.add_argument("--iterations", type=int, default=200, help="passes over the corpus when measuring throughput")
+    args = parser.parse_args()
+
+    documents = load_corpus()
+    if not documents:
+        print(f"❌ No markdown documents found in {CORPUS_DIR}")
+        return 1
+
+    failures = check_outputs(documents, args.update)
+    measure_throughput(documents, args.iterations)
+
+    if failures:
+        print(f"❌ {failures} of {len(documents)} documents changed")
+        return 1
+    print(f"✅ All {len(documents)} documents match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Managed executor for CPU-bound stages (markdown parsing, template rendering)
+so they don't block the event loop
+"""
+import asyncio
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Run fn in the worker and report wall-clock start/end so queue wait can be measured"""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time()
+
+
+class StageTiming:
+    """Aggregated timing for one stage"""
+    __slots__ = ('count', 'errors', 'total_wait', 'total_run', 'max_run')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_wait_ms': round(self.total_wait / self.count * 1000, 2) if self.count else 0.0,
+            'avg_run_ms': round(self.total_run / self.count * 1000, 2) if self.count else 0.0,
+            'max_run_ms': round(self.max_run * 1000, 2)
+        }
+
+
+class CPUExecutor:
+    def __init__(self):
+        self.kind = os.getenv("CPU_EXECUTOR_KIND", "thread").lower()
+        self.max_workers = int(os.getenv("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stages: Dict[str, StageTiming] = {}
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cpu-stage")
+            logging.info(f"CPU executor started ({self.kind}, {self.max_workers} workers)")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Submitted tasks waiting for a free worker"""
+        return max(0, self._pending - self.max_workers)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the executor and record timing under the given stage name.
+
+        A task stays counted as pending until its worker returns, even if the
+        caller stops waiting (e.g. a timeout): a running thread can't be interrupted.
+        """
+        submitted = time.time()
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(_timed_call, fn, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            result, started, finished = await asyncio.wrap_future(future)
+        except Exception:
+            self._record(stage, time.time() - submitted, 0.0, error=True)
+            raise
+
+        self._record(stage, max(0.0, started - submitted), finished - started)
+        return result
+
+    def _record(self, stage: str, wait: float, run: float, error: bool = False):
+        with self._lock:
+            timing = self._stages.get(stage)
+            if timing is None:
+                timing = self._stages[stage] = StageTiming()
+            timing.count += 1
+            if error:
+                timing.errors += 1
+            timing.total_wait += wait
+            timing.total_run += run
+            timing.max_run = max(timing.max_run, run)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of executor load and per-stage timing"""
+        with self._lock:
+            return {
+                'kind': self.kind,
+                'workers': self.max_workers,
+                'pending': self._pending,
+                'queue_depth': self.queue_depth,
+                'stages': {name: timing.to_dict() for name, timing in self._stages.items()}
+            }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logging.info("CPU executor shut down")
+
+
+# Global instance
+cpu_executor = CPUExecutor()
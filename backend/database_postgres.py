@@ -0,0 +1,222 @@
+"""
+Database manager using a direct asyncpg connection pool (DATABASE_URL)
+instead of the PostgREST API.
+
+Queries are fixed SQL strings, so asyncpg prepares each one once per pooled
+connection and reuses the prepared statement on every later call.
+"""
+import os
+import json
+import uuid
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+import asyncpg
+from backends import DatabaseBackend, RESUME_HISTORY_COLUMNS, encode_resume_cursor, decode_resume_cursor
+
+GET_PROFILE_SQL = "SELECT * FROM profiles WHERE user_id = $1"
+
+GET_PROFILE_VERSION_SQL = "SELECT version FROM profiles WHERE user_id = $1"
+
+UPSERT_PROFILE_SQL = """
+INSERT INTO profiles (user_id, profile, role_family)
+VALUES ($1, $2, $3)
+ON CONFLICT (user_id) DO UPDATE SET
+    profile = EXCLUDED.profile,
+    role_family = EXCLUDED.role_family,
+    updated_at = NOW()
+RETURNING *
+"""
+
+PATCH_PROFILE_SQL = "SELECT * FROM patch_profile($1, $2, $3)"
+
+INSERT_RESUME_SQL = """
+INSERT INTO resume_metadata (user_id, resume_id, job_url, status, storage_url, content_hash)
+VALUES ($1, $2, $3, 'generated', $4, $5)
+RETURNING *
+"""
+
+UPDATE_RESUME_STORAGE_URL_SQL = """
+UPDATE resume_metadata SET storage_url = $3
+WHERE user_id = $1 AND resume_id = $2
+RETURNING *
+"""
+
+LIST_RESUMES_SQL = f"""
+SELECT {RESUME_HISTORY_COLUMNS} FROM resume_metadata
+WHERE user_id = $1
+ORDER BY created_at DESC, id DESC
+LIMIT $2
+"""
+
+LIST_RESUMES_AFTER_SQL = f"""
+SELECT {RESUME_HISTORY_COLUMNS} FROM resume_metadata
+WHERE user_id = $1 AND (created_at, id) < ($3, $4)
+ORDER BY created_at DESC, id DESC
+LIMIT $2
+"""
+
+
+def _to_record(row: asyncpg.Record) -> Dict[str, Any]:
+    """Row as a dict with the same JSON-friendly values the PostgREST API returns"""
+    record = dict(row)
+    for key, value in record.items():
+        if isinstance(value, uuid.UUID):
+            record[key] = str(value)
+        elif isinstance(value, datetime):
+            record[key] = value.isoformat()
+    return record
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+class PostgresDatabaseManager(DatabaseBackend):
+    def __init__(self):
+        super().__init__()
+        self.database_url = os.getenv("DATABASE_URL")
+        self.min_size = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+        self.max_size = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+        # Set to 0 behind PgBouncer in transaction mode, which can't hold prepared statements
+        self.statement_cache_size = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100"))
+        self.pool: Optional[asyncpg.Pool] = None
+
+        if not self.database_url:
+            logging.warning("DATABASE_URL not set. Database features will be disabled.")
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.database_url)
+
+    async def init_pool(self):
+        """Open the connection pool"""
+        if not self.database_url:
+            raise Exception("DATABASE_URL not set")
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                self.database_url,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                init=_init_connection
+            )
+            logging.info(f"PostgreSQL pool opened ({self.min_size}-{self.max_size} connections)")
+
+    async def close_pool(self):
+        """Close the connection pool"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            logging.info("PostgreSQL pool closed")
+
+    async def get_connection(self):
+        """Acquire a pooled connection (use as `async with await db.get_connection() as conn`)"""
+        if self.pool is None:
+            await self.init_pool()
+        return self.pool.acquire()
+
+    async def _fetch(self, sql: str, *args) -> List[Dict[str, Any]]:
+        if self.pool is None:
+            await self.init_pool()
+        rows = await self.pool.fetch(sql, *args)
+        return [_to_record(row) for row in rows]
+
+    async def _upsert_profile_row(self, user_id: str, profile_data: Dict[str, Any], role_family: Optional[str]):
+        try:
+            rows = await self._fetch(UPSERT_PROFILE_SQL, user_id, profile_data, role_family)
+            logging.info(f"Profile upserted for user {user_id}")
+            return rows
+        except Exception as e:
+            logging.error(f"Error upserting profile: {e}")
+            raise e
+
+    async def _patch_profile_row(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        try:
+            rows = await self._fetch(PATCH_PROFILE_SQL, user_id, patch, expected_version)
+            return rows[0] if rows else None
+        except Exception as e:
+            logging.error(f"Error patching profile: {e}")
+            raise e
+
+    async def _fetch_profile_row(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            rows = await self._fetch(GET_PROFILE_SQL, user_id)
+            return rows[0] if rows else None
+        except Exception as e:
+            logging.error(f"Error getting profile: {e}")
+            return None
+
+    async def _fetch_profile_version(self, user_id: str) -> Optional[int]:
+        try:
+            rows = await self._fetch(GET_PROFILE_VERSION_SQL, user_id)
+            return rows[0]['version'] if rows else None
+        except Exception as e:
+            logging.error(f"Error getting profile version: {e}")
+            return None
+
+    async def save_resume_metadata(self, user_id: str, resume_id: str, job_url: str = None, storage_url: str = None, content_hash: str = None):
+        try:
+            rows = await self._fetch(INSERT_RESUME_SQL, user_id, resume_id, job_url, storage_url, content_hash)
+            logging.info(f"Resume metadata saved for user {user_id}")
+            return rows
+        except Exception as e:
+            logging.error(f"Error saving resume metadata: {e}")
+            raise e
+
+    async def update_resume_storage_url(self, user_id: str, resume_id: str, storage_url: str):
+        try:
+            rows = await self._fetch(UPDATE_RESUME_STORAGE_URL_SQL, user_id, resume_id, storage_url)
+            logging.info(f"Resume storage URL updated for user {user_id}")
+            return rows
+        except Exception as e:
+            logging.error(f"Error updating resume storage URL: {e}")
+            raise e
+
+    async def get_user_resumes(self, user_id: str) -> List[Dict[str, Any]]:
+        try:
+            return await self._fetch(
+                "SELECT * FROM resume_metadata WHERE user_id = $1 ORDER BY created_at DESC, id DESC",
+                user_id
+            )
+        except Exception as e:
+            logging.error(f"Error getting user resumes: {e}")
+            return []
+
+    async def list_resumes_page(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Fetch one extra row to know whether another page exists
+        if cursor:
+            created_at, row_id = decode_resume_cursor(cursor)
+            try:
+                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError("Invalid cursor")
+            rows = await self._fetch(LIST_RESUMES_AFTER_SQL, user_id, limit + 1, created_at, uuid.UUID(row_id))
+        else:
+            rows = await self._fetch(LIST_RESUMES_SQL, user_id, limit + 1)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_resume_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        return rows, next_cursor
+
+    async def get_referenced_content_hashes(self, user_id: str) -> set:
+        rows = await self._fetch(
+            "SELECT DISTINCT content_hash FROM resume_metadata WHERE user_id = $1 AND content_hash IS NOT NULL",
+            user_id
+        )
+        return {row['content_hash'] for row in rows}
+
+    async def list_user_ids(self) -> List[str]:
+        rows = await self._fetch("SELECT user_id FROM profiles")
+        return [row['user_id'] for row in rows]
+
+    async def delete_resume(self, user_id: str, resume_id: str) -> bool:
+        try:
+            await self._fetch("DELETE FROM resume_metadata WHERE user_id = $1 AND resume_id = $2", user_id, resume_id)
+            logging.info(f"Resume deleted for user {user_id}")
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting resume: {e}")
+            return False
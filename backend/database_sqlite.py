@@ -0,0 +1,195 @@
+"""
+SQLite database backend for running the stack offline.
+
+Mirrors the profiles and resume_metadata tables from setup_database.sql.
+Queries run on a worker thread so they don't block the event loop.
+"""
+import os
+import json
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
+from backends import DatabaseBackend, RESUME_HISTORY_COLUMNS, encode_resume_cursor, decode_resume_cursor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL UNIQUE,
+    profile TEXT NOT NULL,
+    role_family TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resume_metadata (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    resume_id TEXT NOT NULL,
+    job_url TEXT,
+    status TEXT DEFAULT 'generated',
+    storage_url TEXT,
+    content_hash TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resume_metadata_user_created
+    ON resume_metadata(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_resume_metadata_user_hash
+    ON resume_metadata(user_id, content_hash);
+"""
+
+
+def _now() -> str:
+    # Fixed-width UTC timestamps so text ordering matches time ordering
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+class SQLiteDatabaseManager(DatabaseBackend):
+    def __init__(self):
+        super().__init__()
+        self.path = os.getenv(
+            "SQLITE_DATABASE_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "local.db")
+        )
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            logging.info(f"SQLite database opened at {self.path}")
+        return self.conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(sql, params).fetchall()
+            return [dict(row) for row in rows]
+
+    async def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def init_pool(self):
+        """Open the database file and create tables"""
+        await asyncio.to_thread(self._connect)
+
+    async def close_pool(self):
+        """Close the database file"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+                logging.info("SQLite database closed")
+
+    async def _upsert_profile_row(self, user_id: str, profile_data: Dict[str, Any], role_family: Optional[str]):
+        now = _now()
+        rows = await self._query(
+            """INSERT INTO profiles (id, user_id, profile, role_family, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(user_id) DO UPDATE SET
+                   profile = excluded.profile,
+                   role_family = excluded.role_family,
+                   version = profiles.version + 1,
+                   updated_at = excluded.updated_at
+               RETURNING *""",
+            (str(uuid.uuid4()), user_id, json.dumps(profile_data), role_family, now, now)
+        )
+        logging.info(f"Profile upserted for user {user_id}")
+        return [self._decode_profile(row) for row in rows]
+
+    async def _patch_profile_row(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        # json_patch() implements RFC 7396 merge patch natively
+        rows = await self._query(
+            """UPDATE profiles
+               SET profile = json_patch(profile, ?), version = version + 1, updated_at = ?
+               WHERE user_id = ? AND (? IS NULL OR version = ?)
+               RETURNING *""",
+            (json.dumps(patch), _now(), user_id, expected_version, expected_version)
+        )
+        return self._decode_profile(rows[0]) if rows else None
+
+    @staticmethod
+    def _decode_profile(row: Dict[str, Any]) -> Dict[str, Any]:
+        row['profile'] = json.loads(row['profile'])
+        return row
+
+    async def _fetch_profile_row(self, user_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._query("SELECT * FROM profiles WHERE user_id = ?", (user_id,))
+        return self._decode_profile(rows[0]) if rows else None
+
+    async def _fetch_profile_version(self, user_id: str) -> Optional[int]:
+        rows = await self._query("SELECT version FROM profiles WHERE user_id = ?", (user_id,))
+        return rows[0]['version'] if rows else None
+
+    async def save_resume_metadata(self, user_id: str, resume_id: str, job_url: str = None, storage_url: str = None, content_hash: str = None):
+        rows = await self._query(
+            """INSERT INTO resume_metadata (id, user_id, resume_id, job_url, status, storage_url, content_hash, created_at)
+               VALUES (?, ?, ?, ?, 'generated', ?, ?, ?)
+               RETURNING *""",
+            (str(uuid.uuid4()), user_id, resume_id, job_url, storage_url, content_hash, _now())
+        )
+        logging.info(f"Resume metadata saved for user {user_id}")
+        return rows
+
+    async def update_resume_storage_url(self, user_id: str, resume_id: str, storage_url: str):
+        return await self._query(
+            "UPDATE resume_metadata SET storage_url = ? WHERE user_id = ? AND resume_id = ? RETURNING *",
+            (storage_url, user_id, resume_id)
+        )
+
+    async def get_user_resumes(self, user_id: str) -> List[Dict[str, Any]]:
+        return await self._query(
+            "SELECT * FROM resume_metadata WHERE user_id = ? ORDER BY created_at DESC, id DESC",
+            (user_id,)
+        )
+
+    async def list_resumes_page(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        sql = f"SELECT {RESUME_HISTORY_COLUMNS} FROM resume_metadata WHERE user_id = ?"
+        params = [user_id]
+        if cursor:
+            created_at, row_id = decode_resume_cursor(cursor)
+            sql += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += [created_at, created_at, row_id]
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
+
+        rows = await self._query(sql, tuple(params))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_resume_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        return rows, next_cursor
+
+    async def get_referenced_content_hashes(self, user_id: str) -> set:
+        rows = await self._query(
+            "SELECT content_hash FROM resume_metadata WHERE user_id = ? AND content_hash IS NOT NULL",
+            (user_id,)
+        )
+        return {row['content_hash'] for row in rows}
+
+    async def list_user_ids(self) -> List[str]:
+        rows = await self._query("SELECT user_id FROM profiles")
+        return [row['user_id'] for row in rows]
+
+    async def delete_resume(self, user_id: str, resume_id: str) -> bool:
+        try:
+            await self._query(
+                "DELETE FROM resume_metadata WHERE user_id = ? AND resume_id = ?",
+                (user_id, resume_id)
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting resume: {e}")
+            return False
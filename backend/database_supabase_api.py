@@ -3,13 +3,14 @@ Database manager using Supabase API instead of direct PostgreSQL connection
 This is an alternative to the direct PostgreSQL approach
 """
 import os
-import json
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from supabase import create_client, Client
 import logging
+from backends import DatabaseBackend, RESUME_HISTORY_COLUMNS, encode_resume_cursor, decode_resume_cursor
 
-class SupabaseDatabaseManager:
+class SupabaseDatabaseManager(DatabaseBackend):
     def __init__(self):
+        super().__init__()
         self.supabase: Optional[Client] = None
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -23,6 +24,10 @@ class SupabaseDatabaseManager:
         else:
             logging.warning("Supabase URL or Service Role Key not set. Database features will be disabled.")
 
+    @property
+    def is_configured(self) -> bool:
+        return self.supabase is not None
+
     async def init_pool(self):
         """Initialize connection (no-op for API client)"""
         if not self.supabase:
@@ -39,52 +44,68 @@ class SupabaseDatabaseManager:
             raise Exception("Supabase client not initialized")
         return self
 
-    async def upsert_profile(self, user_id: str, profile_data: Dict[str, Any], role_family: str = None):
-        """Insert or update user profile using Supabase API"""
+    async def _upsert_profile_row(self, user_id: str, profile_data: Dict[str, Any], role_family: Optional[str]):
+        """Insert or update user profile in one round trip (upsert on the unique user_id index)"""
         if not self.supabase:
             raise Exception("Supabase client not initialized")
         
         try:
-            # Check if profile exists
-            existing = self.supabase.table('profiles').select('id').eq('user_id', user_id).execute()
-            
             profile_record = {
                 'user_id': user_id,
                 'profile': profile_data,
                 'role_family': role_family
             }
             
-            if existing.data:
-                # Update existing profile
-                result = self.supabase.table('profiles').update(profile_record).eq('user_id', user_id).execute()
-                logging.info(f"Profile updated for user {user_id}")
-            else:
-                # Insert new profile
-                result = self.supabase.table('profiles').insert(profile_record).execute()
-                logging.info(f"Profile created for user {user_id}")
+            result = self.supabase.table('profiles').upsert(profile_record, on_conflict='user_id').execute()
+            logging.info(f"Profile upserted for user {user_id}")
             
             return result.data
         except Exception as e:
             logging.error(f"Error upserting profile: {e}")
             raise e
 
-    async def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user profile using Supabase API"""
+    async def _patch_profile_row(self, user_id: str, patch: Dict[str, Any], expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Merge-patch the profile server-side via the patch_profile() SQL function"""
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        try:
+            result = self.supabase.rpc('patch_profile', {
+                'p_user_id': user_id,
+                'p_patch': patch,
+                'p_expected_version': expected_version
+            }).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logging.error(f"Error patching profile: {e}")
+            raise e
+
+    async def _fetch_profile_row(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user profile row using Supabase API"""
         if not self.supabase:
             raise Exception("Supabase client not initialized")
         
         try:
             result = self.supabase.table('profiles').select('*').eq('user_id', user_id).execute()
-            
-            if result.data:
-                return result.data[0]
-            return None
+            return result.data[0] if result.data else None
         except Exception as e:
             logging.error(f"Error getting profile: {e}")
             return None
 
-    async def save_resume_metadata(self, user_id: str, resume_id: str, job_url: str = None):
-        """Save resume metadata using Supabase API"""
+    async def _fetch_profile_version(self, user_id: str) -> Optional[int]:
+        """Get only the version column of a user's profile"""
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+
+        try:
+            result = self.supabase.table('profiles').select('version').eq('user_id', user_id).execute()
+            return result.data[0]['version'] if result.data else None
+        except Exception as e:
+            logging.error(f"Error getting profile version: {e}")
+            return None
+
+    async def save_resume_metadata(self, user_id: str, resume_id: str, job_url: str = None, storage_url: str = None, content_hash: str = None):
+        """Save resume metadata (including its storage URL and PDF content hash) in a single insert using Supabase API"""
         if not self.supabase:
             raise Exception("Supabase client not initialized")
         
@@ -93,7 +114,9 @@ class SupabaseDatabaseManager:
                 'user_id': user_id,
                 'resume_id': resume_id,
                 'job_url': job_url,
-                'status': 'generated'
+                'status': 'generated',
+                'storage_url': storage_url,
+                'content_hash': content_hash
             }
             
             result = self.supabase.table('resume_metadata').insert(metadata_record).execute()
@@ -131,6 +154,46 @@ class SupabaseDatabaseManager:
             logging.error(f"Error getting user resumes: {e}")
             return []
 
+    async def list_resumes_page(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of a user's resumes, newest first, using keyset pagination on (created_at, id)"""
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        query = self.supabase.table('resume_metadata').select(RESUME_HISTORY_COLUMNS).eq('user_id', user_id)
+        if cursor:
+            created_at, row_id = decode_resume_cursor(cursor)
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+        
+        try:
+            # Fetch one extra row to know whether another page exists
+            result = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        except Exception as e:
+            logging.error(f"Error listing user resumes: {e}")
+            raise e
+        
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_resume_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        return rows, next_cursor
+
+    async def get_referenced_content_hashes(self, user_id: str) -> set:
+        """Content hashes of PDFs still referenced by a user's resumes"""
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        result = self.supabase.table('resume_metadata').select('content_hash').eq('user_id', user_id).not_.is_('content_hash', 'null').execute()
+        return {row['content_hash'] for row in (result.data or [])}
+
+    async def list_user_ids(self) -> List[str]:
+        """IDs of all users with a profile (storage GC walks these)"""
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        result = self.supabase.table('profiles').select('user_id').execute()
+        return [row['user_id'] for row in (result.data or [])]
+
     async def delete_resume(self, user_id: str, resume_id: str) -> bool:
         """Delete resume metadata using Supabase API"""
         if not self.supabase:
@@ -143,6 +206,3 @@ class SupabaseDatabaseManager:
         except Exception as e:
             logging.error(f"Error deleting resume: {e}")
             return False
-
-# Global instance
-supabase_db_manager = SupabaseDatabaseManager()
@@ -3,7 +3,13 @@
 Flexible Resume Processor that handles optional sections
 """
 import re
-from typing import Dict, List, Any, Optional
+import time
+from typing import Dict, List, Any, Optional, Tuple
+from resume_model import StructuredResume, ExperienceEntry, EducationEntry, ProjectEntry, to_context_value
+
+class ParseDeadlineExceeded(Exception):
+    """Raised when parsing runs past its wall-clock deadline"""
+
 
 class FlexibleResumeProcessor:
     """Process resume content with flexible section handling"""
@@ -17,9 +23,20 @@ class FlexibleResumeProcessor:
             'linkedin', 'github', 'certifications', 'projects', 
             'core_skills', 'interests', 'achievements', 'additional'
         ]
+        self._deadline: Optional[float] = None
     
-    def process_resume_content(self, resume_content: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process resume content and return structured data"""
+    def process_resume_content(self, resume_content: str, profile_data: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Process resume content and return structured data as a template context dict"""
+        return self.process_resume(resume_content, profile_data, deadline).to_context()
+
+    def process_resume(self, resume_content: str, profile_data: Dict[str, Any], deadline: Optional[float] = None) -> StructuredResume:
+        """Process resume content and return a typed StructuredResume.
+
+        If deadline (a time.time() timestamp) is given, ParseDeadlineExceeded
+        is raised between parsing steps once it has passed.
+        """
+        self._deadline = deadline
+        self._check_deadline()
         # Normalize separators and remove stray markdown rules
         cleaned = []
         for line in resume_content.split('\n'):
@@ -30,6 +47,7 @@ class FlexibleResumeProcessor:
 
         # Extract personal information from profile_data first, then from markdown
         personal_info = self._extract_personal_info(resume_content)
+        self._check_deadline()
         
         # Use profile_data for contact info if available
         if profile_data and 'personal_info' in profile_data:
@@ -44,47 +62,56 @@ class FlexibleResumeProcessor:
         
         # Extract required sections
         summary = self._extract_summary(resume_content)
+        self._check_deadline()
         experience = self._parse_experience_section(resume_content)
+        self._check_deadline()
         education = self._parse_education_section(resume_content)
+        self._check_deadline()
         languages = self._extract_languages(resume_content)
+        self._check_deadline()
         
         # Extract optional sections
         linkedin = personal_info.get('linkedin', '')
         github = personal_info.get('github', '')
         certifications = self._parse_certifications_section(resume_content)
+        self._check_deadline()
         projects = self._parse_projects_section(resume_content)
+        self._check_deadline()
         core_skills = self._extract_core_skills(resume_content, {})
+        self._check_deadline()
         interests = self._extract_interests(resume_content)
+        self._check_deadline()
         
         # Extract skills as tags (for backward compatibility)
         tags = self._extract_skills_as_tags(resume_content)
+        fit = self._extract_fit(resume_content)
+        self._check_deadline()
         
         # Build structured data
-        structured_data = {
-            'name': personal_info.get('name', ''),
-            'title': personal_info.get('title', ''),
-            'email': personal_info.get('email', ''),
-            'phone': personal_info.get('phone', ''),
-            'location': personal_info.get('location', ''),
-            'linkedin': linkedin,
-            'github': github,
-            'summary': summary,
-            'experience': experience,
-            'education': education,
-            'languages': languages,
-            'tags': tags,
-            'core_skills': core_skills,
-            'interests': interests,
-            'certifications': certifications,
-            'projects': projects,
-            'achievements': [],
-            'strengths': [],
-            'additional': '',
-            'fit': self._extract_fit(resume_content),
-            'currentYear': '2025'
-        }
-        
-        return structured_data
+        return StructuredResume(
+            name=personal_info.get('name', ''),
+            title=personal_info.get('title', ''),
+            email=personal_info.get('email', ''),
+            phone=personal_info.get('phone', ''),
+            location=personal_info.get('location', ''),
+            linkedin=linkedin,
+            github=github,
+            summary=summary,
+            experience=experience,
+            education=education,
+            languages=languages,
+            tags=tags,
+            core_skills=core_skills,
+            interests=interests,
+            certifications=certifications,
+            projects=projects,
+            fit=fit
+        )
+
+    def _check_deadline(self):
+        """Abort parsing if the wall-clock deadline has passed"""
+        if self._deadline is not None and time.time() > self._deadline:
+            raise ParseDeadlineExceeded("Resume parsing exceeded its deadline")
     
     def _extract_personal_info(self, resume_content: str) -> Dict[str, str]:
         """Extract personal information from resume content"""
@@ -166,7 +193,7 @@ class FlexibleResumeProcessor:
         
         return ""
     
-    def _parse_experience_section(self, resume_content: str) -> List[Dict[str, str]]:
+    def _parse_experience_section(self, resume_content: str) -> List[ExperienceEntry]:
         """Parse experience section"""
         experience = []
         
@@ -191,6 +218,7 @@ class FlexibleResumeProcessor:
             jobs = re.split(r'\n(?=\*\*[^*]+(?!.*(?:Global|Poland|Denmark|Mar|Apr|Jul|Present|2025|2024|2021))\*\*)', exp_content)
             
             for job in jobs:
+                self._check_deadline()
                 if job.strip():
                     lines = [line.strip() for line in job.strip().split('\n') if line.strip()]
                     
@@ -248,14 +276,14 @@ class FlexibleResumeProcessor:
                                 else:
                                     bullets.append(bullet)
                         
-                        experience.append({
-                            'title': title,
-                            'company': company,
-                            'startDate': start_date,
-                            'endDate': end_date,
-                            'bullets': bullets,
-                            'impact': impact
-                        })
+                        experience.append(ExperienceEntry(
+                            title=title,
+                            company=company,
+                            start_date=start_date,
+                            end_date=end_date,
+                            bullets=bullets,
+                            impact=impact
+                        ))
         
         return experience
 
@@ -287,7 +315,7 @@ class FlexibleResumeProcessor:
         # If one long paragraph, return as single-item list to render cleanly
         return items
     
-    def _parse_education_section(self, resume_content: str) -> List[Dict[str, str]]:
+    def _parse_education_section(self, resume_content: str) -> List[EducationEntry]:
         """Parse education section"""
         education = []
         
@@ -350,10 +378,10 @@ class FlexibleResumeProcessor:
                                 start_date = ""
                                 end_date = ""
                         
-                        education.append({
-                            'name': f"{degree} – {institution}",
-                            'dates': f"{start_date} – {end_date}" if start_date and end_date else ""
-                        })
+                        education.append(EducationEntry(
+                            name=f"{degree} – {institution}",
+                            dates=f"{start_date} – {end_date}" if start_date and end_date else ""
+                        ))
         
         return education
     
@@ -449,7 +477,7 @@ class FlexibleResumeProcessor:
         
         return certifications
     
-    def _parse_projects_section(self, resume_content: str) -> List[Dict[str, str]]:
+    def _parse_projects_section(self, resume_content: str) -> List[ProjectEntry]:
         """Parse projects section"""
         projects = []
         
@@ -483,11 +511,11 @@ class FlexibleResumeProcessor:
                     if '|' in line:
                         parts = [part.strip() for part in line.split('|') if part.strip()]
                         if len(parts) >= 3:
-                            projects.append({
-                                'name': parts[0],
-                                'stack': parts[1],
-                                'desc': [parts[2]] if parts[2] else []
-                            })
+                            projects.append(ProjectEntry(
+                                name=parts[0],
+                                stack=parts[1],
+                                desc=[parts[2]] if parts[2] else []
+                            ))
             else:
                 # Parse bullet point format
                 lines = [line.strip() for line in proj_content.split('\n') if line.strip()]
@@ -506,11 +534,11 @@ class FlexibleResumeProcessor:
                                 if tools_match:
                                     tools = [tool.strip() for tool in tools_match.group(1).split('&')]
                             
-                            projects.append({
-                                'name': project_name,
-                                'stack': ', '.join(tools) if tools else '',
-                                'desc': [description]
-                            })
+                            projects.append(ProjectEntry(
+                                name=project_name,
+                                stack=', '.join(tools) if tools else '',
+                                desc=[description]
+                            ))
         
         return projects
     
@@ -674,3 +702,132 @@ class FlexibleResumeProcessor:
                                 interests.append(interest)
         
         return interests
+
+
+class StreamingResumeProcessor(FlexibleResumeProcessor):
+    """Incrementally process resume markdown as it streams in from the LLM.
+
+    Chunks are passed to ``feed``; whenever a ``###`` heading closes the
+    previous section, that section is parsed on its own and returned right
+    away. ``finish`` flushes the last section and returns the full result,
+    identical to ``process_resume`` on the complete markdown.
+    """
+
+    # Section heading (lowercased) -> structured fields it produces
+    SECTION_FIELDS = {
+        'professional summary': ('summary',),
+        'key competencies': ('tags', 'core_skills'),
+        'core technical skills': ('core_skills',),
+        'professional experience': ('experience',),
+        'experience': ('experience',),
+        'education': ('education',),
+        'how i fit for the position': ('fit',),
+        'how this matches the role': ('fit',),
+        'languages': ('languages',),
+        'certifications': ('certifications',),
+        'certifications & training': ('certifications',),
+        'selected projects': ('projects',),
+        'projects': ('projects',),
+        'interests': ('interests',),
+    }
+
+    def __init__(self, profile_data: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.profile_data = profile_data or {}
+        self._partial_line = ''
+        self._lines: List[str] = []
+        self._section_start = 0
+        self._section_title: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Consume a chunk of markdown and return (section, fields) for every section it closed"""
+        if '\n' not in chunk:
+            self._partial_line += chunk
+            return []
+
+        *complete, self._partial_line = (self._partial_line + chunk).split('\n')
+        results = []
+        for line in complete:
+            if line.strip() == '---':
+                continue
+            if line.lstrip().startswith('###'):
+                result = self._close_section()
+                if result:
+                    results.append(result)
+                self._section_start = len(self._lines)
+                self._section_title = line.strip().lstrip('#').strip().rstrip(':').strip()
+            self._lines.append(line)
+        return results
+
+    def flush(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Close the trailing section once the stream has ended and return what it closed"""
+        if self._partial_line:
+            self.feed('\n')
+        result = self._close_section()
+        return [result] if result else []
+
+    def finish(self) -> Tuple[List[Tuple[str, Dict[str, Any]]], StructuredResume]:
+        """Flush the trailing section and return (closed sections, full structured data).
+
+        Parses synchronously; the API runs the final parse with parse_resume() instead.
+        """
+        return self.flush(), self.process_resume(self.markdown, self.profile_data)
+
+    @property
+    def markdown(self) -> str:
+        """Markdown received so far (complete lines only)"""
+        return '\n'.join(self._lines)
+
+    def _close_section(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Parse the section currently being collected, if it has any content"""
+        section_lines = self._lines[self._section_start:]
+        if not any(line.strip() for line in section_lines):
+            return None
+        section_content = '\n'.join(section_lines)
+
+        # Everything before the first heading is the name/title header
+        if self._section_title is None:
+            return 'header', self._parse_header(section_content)
+
+        fields = self.SECTION_FIELDS.get(self._section_title.lower())
+        if not fields:
+            return None
+        return self._section_title, {field: to_context_value(self._parse_field(field, section_content)) for field in fields}
+
+    def _parse_header(self, section_content: str) -> Dict[str, Any]:
+        """Parse personal info from the header block, letting the profile override contact fields"""
+        personal_info = self._extract_personal_info(section_content)
+        if self.profile_data and 'personal_info' in self.profile_data:
+            profile_personal = self.profile_data['personal_info']
+            personal_info.update({
+                'email': profile_personal.get('email', personal_info.get('email', '')),
+                'phone': profile_personal.get('phone', personal_info.get('phone', '')),
+                'location': profile_personal.get('location', personal_info.get('location', '')),
+                'linkedin': profile_personal.get('linkedin_url', personal_info.get('linkedin', '')),
+                'github': profile_personal.get('github_url', personal_info.get('github', ''))
+            })
+        return personal_info
+
+    def _parse_field(self, field: str, section_content: str) -> Any:
+        """Run the extractor for a single structured field against one section"""
+        if field == 'summary':
+            return self._extract_summary(section_content)
+        if field == 'experience':
+            return self._parse_experience_section(section_content)
+        if field == 'education':
+            return self._parse_education_section(section_content)
+        if field == 'languages':
+            return self._extract_languages(section_content)
+        if field == 'certifications':
+            return self._parse_certifications_section(section_content)
+        if field == 'projects':
+            return self._parse_projects_section(section_content)
+        if field == 'core_skills':
+            return self._extract_core_skills(section_content, {})
+        if field == 'tags':
+            return self._extract_skills_as_tags(section_content)
+        if field == 'interests':
+            return self._extract_interests(section_content)
+        if field == 'fit':
+            return self._extract_fit(section_content)
+        return None
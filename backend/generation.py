@@ -0,0 +1,137 @@
+"""
+Resume generation pipelines (agent → parser → template → PDF → storage),
+shared by the HTTP endpoints and the background job worker
+"""
+import os
+import json
+import hashlib
+import logging
+from pipeline import (
+    Pipeline, GenerationContext, AgentStage, ParseStage, ProfileOverrideStage,
+    TemplateStage, RenderStage, UploadStage, MetadataStage
+)
+from limits import MAX_PROFILE_BYTES, enforce_max_bytes
+from template_renderer import TEMPLATE_PATH
+from ttl_cache import TTLCache
+
+PREVIEW_CACHE_TTL_SECONDS = float(os.getenv("PREVIEW_CACHE_TTL_SECONDS", "600"))
+PREVIEW_CACHE_MAX_ENTRIES = int(os.getenv("PREVIEW_CACHE_MAX_ENTRIES", "1000"))
+
+# Each endpoint is a pipeline configuration
+AGENT_RESUME_PIPELINE = Pipeline("resume_agent", [
+    AgentStage(), ParseStage(), ProfileOverrideStage(), TemplateStage(), RenderStage(), UploadStage(), MetadataStage()
+])
+MARKDOWN_PDF_PIPELINE = Pipeline("markdown_pdf", [
+    ParseStage(), ProfileOverrideStage(), TemplateStage(), RenderStage(), UploadStage(), MetadataStage()
+])
+# Live editor preview: HTML only, no browser, storage or database
+HTML_PREVIEW_PIPELINE = Pipeline("html_preview", [ParseStage(), ProfileOverrideStage(), TemplateStage()])
+
+# preview hash -> rendered HTML
+_preview_cache = TTLCache(PREVIEW_CACHE_MAX_ENTRIES, PREVIEW_CACHE_TTL_SECONDS, name="html_previews")
+
+
+def enforce_profile_size(profile) -> str:
+    """Serialize a profile for the agent prompt, rejecting it if it is too large"""
+    profile_json = json.dumps(profile, ensure_ascii=False)
+    enforce_max_bytes("profile", profile_json.encode("utf-8"), MAX_PROFILE_BYTES)
+    return profile_json
+
+
+def _log_result(ctx: GenerationContext):
+    if ctx.spooled.uploaded:
+        logging.info(f"PDF stored successfully: {ctx.spooled.storage_url}")
+    else:
+        logging.info(f"PDF spooled, upload will be retried in the background: {ctx.spooled.storage_url}")
+
+
+async def generate_flexible_cv(user_id: str, profile_data: dict, job_offer_url: str) -> dict:
+    """JSON profile → AI agent → markdown → flexible parser → PDF → storage"""
+    logging.info(f"Profile data keys: {list(profile_data.keys())}")
+    ctx = await AGENT_RESUME_PIPELINE.run(GenerationContext(
+        user_id=user_id,
+        profile=profile_data,
+        agent_profile=profile_data,
+        agent_target=job_offer_url,
+        metadata_label=job_offer_url
+    ))
+    _log_result(ctx)
+    return {
+        "message": "AI Flexible CV generated and stored successfully",
+        "storage_url": ctx.spooled.storage_url,
+        "upload_pending": not ctx.spooled.uploaded,
+        "resume_id": ctx.resume_id,
+        "resume": ctx.markdown  # Return the generated markdown for display
+    }
+
+
+async def generate_agent_resume(user_id: str, profile: dict, job_description: str) -> dict:
+    """Profile + job description → Agent 1 → flexible parser → template → PDF → storage"""
+    ctx = await AGENT_RESUME_PIPELINE.run(GenerationContext(
+        user_id=user_id,
+        profile=profile,
+        agent_profile=enforce_profile_size(profile),
+        agent_target=job_description,
+        metadata_label=job_description[:100] + "..." if len(job_description) > 100 else job_description
+    ))
+    _log_result(ctx)
+    return {
+        "message": "Resume generated successfully using Agent 1",
+        "markdown": ctx.markdown,
+        "resume": ctx.markdown,  # For backward compatibility
+        "resume_id": ctx.resume_id,
+        "storage_url": ctx.spooled.storage_url,
+        "upload_pending": not ctx.spooled.uploaded,
+        "agent_used": "agent1"
+    }
+
+
+async def generate_pdf_from_markdown(user_id: str, markdown: str, profile: dict) -> dict:
+    """User-edited markdown → flexible parser → template → PDF → storage"""
+    ctx = await MARKDOWN_PDF_PIPELINE.run(GenerationContext(
+        user_id=user_id,
+        profile=profile,
+        markdown=markdown,
+        metadata_label="Edited markdown export"
+    ))
+    _log_result(ctx)
+    return {
+        "message": "PDF generated from edited markdown",
+        "resume_id": ctx.resume_id,
+        "storage_url": ctx.spooled.storage_url,
+        "upload_pending": not ctx.spooled.uploaded
+    }
+
+
+def preview_hash(markdown: str, profile: dict) -> str:
+    """Hash of everything the preview depends on, including the template version"""
+    digest = hashlib.sha256()
+    digest.update(markdown.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(profile, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(os.path.getmtime(TEMPLATE_PATH)).encode("ascii"))
+    return digest.hexdigest()
+
+
+async def render_html_preview(user_id: str, markdown: str, profile: dict, key: str) -> str:
+    """Markdown → flexible parser → template → HTML, cached under key (from preview_hash())"""
+    html = _preview_cache.get(key)
+    if html is None:
+        ctx = await HTML_PREVIEW_PIPELINE.run(GenerationContext(user_id=user_id, profile=profile, markdown=markdown))
+        html = ctx.html
+        _preview_cache.set(key, html)
+    return html
+
+
+# Job kinds the background worker can run: kind -> (pipeline, payload keys)
+JOB_PIPELINES = {
+    "flexible_cv": (generate_flexible_cv, ("profile", "job_offer_url")),
+    "resume_agent": (generate_agent_resume, ("profile", "job_description")),
+}
+
+
+async def run_job_pipeline(kind: str, user_id: str, payload: dict) -> dict:
+    """Run the pipeline for a queued job"""
+    pipeline, keys = JOB_PIPELINES[kind]
+    return await pipeline(user_id, *(payload[key] for key in keys))
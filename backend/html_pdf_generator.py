@@ -1,25 +1,75 @@
 """
-HTML to PDF generator using Playwright for better rendering quality
+HTML to PDF generator using Playwright for better rendering quality.
+
+By default each process launches its own headless Chromium. With
+PLAYWRIGHT_WS_ENDPOINT set (one or more comma-separated ws:// URLs of
+`playwright run-server` instances) processes connect to shared browser
+servers instead, reconnecting when the connection drops.
 """
 import asyncio
 import os
 import tempfile
+from importlib import metadata
 from typing import Optional
 from playwright.async_api import async_playwright
+from backends import render_content_hash
+from metrics import browser_connects_total
 import logging
 
+PLAYWRIGHT_WS_ENDPOINTS = [url.strip() for url in os.getenv("PLAYWRIGHT_WS_ENDPOINT", "").split(",") if url.strip()]
+PLAYWRIGHT_CONNECT_TIMEOUT_SECONDS = float(os.getenv("PLAYWRIGHT_CONNECT_TIMEOUT_SECONDS", "10"))
+
+# Part of every PDF's object key; bump the prefix when render settings change the output
+PDF_RENDERER_VERSION = f"pdf-1/playwright-{metadata.version('playwright')}"
+
+# Default PDF options
+DEFAULT_PDF_OPTIONS = {
+    'format': 'A4',
+    'print_background': True,
+    'margin': {
+        'top': '0.5in',
+        'right': '0.5in',
+        'bottom': '0.5in',
+        'left': '0.5in'
+    },
+    'prefer_css_page_size': True,
+    'display_header_footer': False
+}
+
 class HTMLToPDFGenerator:
     def __init__(self):
         self.playwright = None
         self.browser = None
         self.context = None
-        
+        self.open_pages = 0
+        self._init_lock = asyncio.Lock()
+        # Spread worker processes over the browser servers
+        self._endpoint_index = os.getpid() % len(PLAYWRIGHT_WS_ENDPOINTS) if PLAYWRIGHT_WS_ENDPOINTS else 0
+
+    @property
+    def is_connected(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
     async def initialize(self):
-        """Initialize Playwright browser"""
-        if not self.playwright:
-            self.playwright = await async_playwright().start()
+        """Initialize Playwright browser (or reconnect after the browser went away)"""
+        if self.is_connected and self.context is not None:
+            return
+        async with self._init_lock:
+            if self.is_connected and self.context is not None:
+                return
+            if not self.playwright:
+                self.playwright = await async_playwright().start()
+            self.browser = await self._open_browser()
+            self.browser.on("disconnected", self._on_disconnected)
+            self.context = await self.browser.new_context(
+                viewport={'width': 1200, 'height': 800},
+                device_scale_factor=1
+            )
+
+    async def _open_browser(self):
+        if not PLAYWRIGHT_WS_ENDPOINTS:
             # Use Chromium for better PDF rendering
-            self.browser = await self.playwright.chromium.launch(
+            browser = await self.playwright.chromium.launch(
                 headless=True,
                 args=[
                     '--no-sandbox',
@@ -31,25 +81,49 @@ class HTMLToPDFGenerator:
                     '--disable-gpu'
                 ]
             )
-            self.context = await self.browser.new_context(
-                viewport={'width': 1200, 'height': 800},
-                device_scale_factor=1
-            )
+            browser_connects_total.inc(mode="launch", outcome="ok")
             logging.info("Playwright browser initialized")
+            return browser
+
+        # Try each browser server once, starting with this process's preferred one
+        last_error = None
+        for _ in range(len(PLAYWRIGHT_WS_ENDPOINTS)):
+            endpoint = PLAYWRIGHT_WS_ENDPOINTS[self._endpoint_index]
+            try:
+                browser = await self.playwright.chromium.connect(
+                    endpoint, timeout=PLAYWRIGHT_CONNECT_TIMEOUT_SECONDS * 1000
+                )
+                browser_connects_total.inc(mode="remote", outcome="ok")
+                logging.info(f"Connected to Playwright browser server {endpoint}")
+                return browser
+            except Exception as e:
+                browser_connects_total.inc(mode="remote", outcome="error")
+                logging.warning(f"Failed to connect to Playwright browser server {endpoint}: {e}")
+                last_error = e
+                self._endpoint_index = (self._endpoint_index + 1) % len(PLAYWRIGHT_WS_ENDPOINTS)
+        raise RuntimeError(f"No Playwright browser server reachable: {last_error}")
+
+    def _on_disconnected(self, browser):
+        # Only forget the browser we currently hold; the next render reconnects
+        if browser is self.browser:
+            logging.warning("Playwright browser disconnected")
+            self.browser = None
+            self.context = None
 
     async def close(self):
         """Close Playwright browser with proper error handling"""
+        context, self.context = self.context, None
+        browser, self.browser = self.browser, None
         try:
-            if self.context:
-                await asyncio.wait_for(self.context.close(), timeout=5.0)
-                self.context = None
+            if context:
+                await asyncio.wait_for(context.close(), timeout=5.0)
         except Exception as e:
             logging.warning(f"Error closing Playwright context: {e}")
         
         try:
-            if self.browser:
-                await asyncio.wait_for(self.browser.close(), timeout=5.0)
-                self.browser = None
+            # For a remote browser server this only drops our connection
+            if browser:
+                await asyncio.wait_for(browser.close(), timeout=5.0)
         except Exception as e:
             logging.warning(f"Error closing Playwright browser: {e}")
         
@@ -62,6 +136,18 @@ class HTMLToPDFGenerator:
         
         logging.info("Playwright browser cleanup completed")
 
+    @staticmethod
+    def pdf_options(options: Optional[dict] = None) -> dict:
+        """Default PDF options merged with custom ones"""
+        pdf_options = dict(DEFAULT_PDF_OPTIONS)
+        if options:
+            pdf_options.update(options)
+        return pdf_options
+
+    def content_key(self, html_content: str, options: Optional[dict] = None) -> str:
+        """Stable object key for the PDF this HTML renders to"""
+        return render_content_hash(html_content, self.pdf_options(options), PDF_RENDERER_VERSION)
+
     async def generate_pdf_from_html(self, html_content: str, user_id: str, options: Optional[dict] = None) -> bytes:
         """
         Generate PDF from HTML content using Playwright
@@ -74,29 +160,30 @@ class HTMLToPDFGenerator:
         Returns:
             PDF bytes
         """
-        await self.initialize()
-        
-        # Default PDF options
-        pdf_options = {
-            'format': 'A4',
-            'print_background': True,
-            'margin': {
-                'top': '0.5in',
-                'right': '0.5in',
-                'bottom': '0.5in',
-                'left': '0.5in'
-            },
-            'prefer_css_page_size': True,
-            'display_header_footer': False
-        }
-        
-        # Merge with custom options
-        if options:
-            pdf_options.update(options)
+        pdf_options = self.pdf_options(options)
         
+        try:
+            try:
+                pdf_bytes = await self._render_html(html_content, pdf_options)
+            except Exception:
+                # A dropped browser connection is retried once on a fresh one
+                if self.is_connected:
+                    raise
+                logging.warning("Browser connection lost during render, retrying")
+                pdf_bytes = await self._render_html(html_content, pdf_options)
+            logging.info(f"PDF generated successfully for user {user_id}")
+            return pdf_bytes
+        except Exception as e:
+            logging.error(f"Error generating PDF with Playwright: {e}")
+            raise e
+
+    async def _render_html(self, html_content: str, pdf_options: dict) -> bytes:
+        await self.initialize()
+        page = None
         try:
             # Create a new page
             page = await self.context.new_page()
+            self.open_pages += 1
             
             # Set content and wait for it to load
             await page.set_content(html_content, wait_until='networkidle')
@@ -105,17 +192,15 @@ class HTMLToPDFGenerator:
             await page.wait_for_timeout(1000)
             
             # Generate PDF
-            pdf_bytes = await page.pdf(**pdf_options)
-            
-            # Close the page
-            await page.close()
-            
-            logging.info(f"PDF generated successfully for user {user_id}")
-            return pdf_bytes
-            
-        except Exception as e:
-            logging.error(f"Error generating PDF with Playwright: {e}")
-            raise e
+            return await page.pdf(**pdf_options)
+        finally:
+            # Close the page even when rendering failed
+            if page is not None:
+                self.open_pages -= 1
+                try:
+                    await page.close()
+                except Exception as e:
+                    logging.warning(f"Error closing Playwright page: {e}")
 
     async def generate_pdf_from_url(self, url: str, user_id: str, options: Optional[dict] = None) -> bytes:
         """
@@ -131,23 +216,7 @@ class HTMLToPDFGenerator:
         """
         await self.initialize()
         
-        # Default PDF options
-        pdf_options = {
-            'format': 'A4',
-            'print_background': True,
-            'margin': {
-                'top': '0.5in',
-                'right': '0.5in',
-                'bottom': '0.5in',
-                'left': '0.5in'
-            },
-            'prefer_css_page_size': True,
-            'display_header_footer': False
-        }
-        
-        # Merge with custom options
-        if options:
-            pdf_options.update(options)
+        pdf_options = self.pdf_options(options)
         
         try:
             # Create a new page
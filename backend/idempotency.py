@@ -0,0 +1,224 @@
+"""
+Idempotency-Key support for the expensive POST endpoints.
+
+The first request with a key claims it; its successful response is stored
+for IDEMPOTENCY_TTL_SECONDS and replayed for retries with the same key
+instead of running the pipeline again. A retry that arrives while the first
+request is still running waits for it (up to IDEMPOTENCY_WAIT_SECONDS).
+Keys live in SQLite so every worker process on the host shares them.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from limits import REQUEST_DEADLINE_SECONDS
+from metrics import idempotent_replays_total
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'in_progress',
+    response_status INTEGER,
+    response_body TEXT,
+    response_headers TEXT,
+    locked_until REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (user_id, endpoint, key)
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expiry ON idempotency_keys(expires_at);
+"""
+
+MAX_KEY_LENGTH = 255
+# Response headers worth replaying
+REPLAYED_HEADERS = ("Location",)
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Hash of the request a key was first used with"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self):
+        self.path = os.getenv(
+            "IDEMPOTENCY_DB_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "idempotency.db")
+        )
+        self.ttl = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.wait_seconds = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+        self.poll_interval = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL_SECONDS", "0.5"))
+        # A claim outlives the request deadline so only crashed requests lose it
+        self.lock_seconds = (REQUEST_DEADLINE_SECONDS or 300) + 60
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            logging.info(f"Idempotency store opened at {self.path}")
+        return self.conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(sql, params).fetchall()
+            return [dict(row) for row in rows]
+
+    async def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _claim(self, user_id: str, endpoint: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim the key in one transaction; None if claimed, else the existing record"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
+                # Take over keys whose owner died mid-request
+                claimed = conn.execute(
+                    """INSERT INTO idempotency_keys (user_id, endpoint, key, fingerprint, locked_until, expires_at, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (user_id, endpoint, key) DO UPDATE
+                       SET fingerprint = excluded.fingerprint, locked_until = excluded.locked_until,
+                           expires_at = excluded.expires_at, created_at = excluded.created_at
+                       WHERE idempotency_keys.status = 'in_progress' AND idempotency_keys.locked_until < ?
+                       RETURNING key""",
+                    (user_id, endpoint, key, fingerprint, now + self.lock_seconds, now + self.ttl, now, now)
+                ).fetchall()
+                if claimed:
+                    return None
+                row = conn.execute(
+                    "SELECT * FROM idempotency_keys WHERE user_id = ? AND endpoint = ? AND key = ?",
+                    (user_id, endpoint, key)
+                ).fetchone()
+            return dict(row) if row else None
+
+    async def claim(self, user_id: str, endpoint: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._claim, user_id, endpoint, key, fingerprint)
+
+    async def get(self, user_id: str, endpoint: str, key: str) -> Optional[Dict[str, Any]]:
+        rows = await self._query(
+            "SELECT * FROM idempotency_keys WHERE user_id = ? AND endpoint = ? AND key = ?",
+            (user_id, endpoint, key)
+        )
+        return rows[0] if rows else None
+
+    async def wait(self, user_id: str, endpoint: str, key: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Poll until the key completes, is released, or timeout (default IDEMPOTENCY_WAIT_SECONDS) passes"""
+        deadline = time.monotonic() + (self.wait_seconds if timeout is None else timeout)
+        while True:
+            record = await self.get(user_id, endpoint, key)
+            if record is None or record["status"] == "completed" or time.monotonic() >= deadline:
+                return record
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    async def complete(self, user_id: str, endpoint: str, key: str, status_code: int, body: Any, headers: Dict[str, str]):
+        await self._query(
+            """UPDATE idempotency_keys
+               SET status = 'completed', response_status = ?, response_body = ?, response_headers = ?
+               WHERE user_id = ? AND endpoint = ? AND key = ?""",
+            (status_code, json.dumps(body, ensure_ascii=False), json.dumps(headers), user_id, endpoint, key)
+        )
+
+    async def release(self, user_id: str, endpoint: str, key: str):
+        """Forget an unfinished claim so a retry runs the request again"""
+        await self._query(
+            "DELETE FROM idempotency_keys WHERE user_id = ? AND endpoint = ? AND key = ? AND status = 'in_progress'",
+            (user_id, endpoint, key)
+        )
+
+
+def _replay(record: Dict[str, Any], endpoint: str) -> JSONResponse:
+    idempotent_replays_total.inc(endpoint=endpoint)
+    headers = json.loads(record["response_headers"] or "{}")
+    headers["Idempotent-Replayed"] = "true"
+    return JSONResponse(
+        status_code=record["response_status"],
+        content=json.loads(record["response_body"]),
+        headers=headers
+    )
+
+
+async def run_idempotent(
+    key: Optional[str],
+    user_id: str,
+    endpoint: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]]
+) -> Any:
+    """Run handler once per (user, endpoint, Idempotency-Key); replay its stored response for retries.
+
+    Only successful responses are stored. Errors and cancellations release
+    the key so the client can retry.
+    """
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+    fingerprint = request_fingerprint(payload)
+    deadline = time.monotonic() + idempotency_store.wait_seconds
+    # The handler only runs once claim() succeeds; every other way out replays or raises
+    while True:
+        record = await idempotency_store.claim(user_id, endpoint, key, fingerprint)
+        if record is None:
+            break
+        if record["status"] != "completed" and record["fingerprint"] == fingerprint:
+            record = await idempotency_store.wait(
+                user_id, endpoint, key, timeout=max(0.0, deadline - time.monotonic())
+            )
+            if record is None:
+                # The request holding the key failed and released it; try to take it over
+                continue
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record["status"] == "completed":
+            return _replay(record, endpoint)
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "5"}
+        )
+
+    try:
+        result = await handler()
+    except BaseException:
+        await idempotency_store.release(user_id, endpoint, key)
+        raise
+
+    response = result if isinstance(result, Response) else JSONResponse(content=jsonable_encoder(result))
+    if 200 <= response.status_code < 300 and isinstance(response, JSONResponse):
+        headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        await idempotency_store.complete(
+            user_id, endpoint, key, response.status_code, json.loads(response.body), headers
+        )
+    else:
+        await idempotency_store.release(user_id, endpoint, key)
+    return response
+
+
+# Global instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,211 @@
+"""
+Durable SQLite job queue for asynchronous resume generation.
+
+API processes enqueue jobs and answer status polls; separate worker
+processes (job_worker.py) claim jobs with a lease, run the pipeline and
+store the result. Point every process at the same JOB_QUEUE_PATH.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_until REAL,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(status, updated_at);
+"""
+
+# Longest a status request may long-poll
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "30"))
+
+# Queued jobs beyond which new submissions get 429 (0 = unbounded)
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "0"))
+
+# Terminal states; anything else is still in flight
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class JobQueue:
+    def __init__(self):
+        self.path = os.getenv(
+            "JOB_QUEUE_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db")
+        )
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.retry_delay = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "5"))
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+        self.result_ttl = float(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self.conn.row_factory = sqlite3.Row
+            # WAL lets API pollers read while a worker writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            logging.info(f"Job queue opened at {self.path}")
+        return self.conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(sql, params).fetchall()
+            return [dict(row) for row in rows]
+
+    async def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    @staticmethod
+    def to_response(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job row for the status endpoint"""
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "result": json.loads(job["result"]) if job["result"] else None,
+            "error": job["error"],
+            "created_at": _iso(job["created_at"]),
+            "updated_at": _iso(job["updated_at"])
+        }
+
+    async def enqueue(self, kind: str, user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a job and return its row"""
+        now = time.time()
+        rows = await self._query(
+            """INSERT INTO jobs (id, kind, user_id, payload, run_after, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               RETURNING *""",
+            (str(uuid.uuid4()), kind, user_id, json.dumps(payload, ensure_ascii=False), now, now, now)
+        )
+        return rows[0]
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """A user's job by id"""
+        rows = await self._query("SELECT * FROM jobs WHERE id = ? AND user_id = ?", (job_id, user_id))
+        return rows[0] if rows else None
+
+    async def wait(self, job_id: str, user_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: return the job once it has finished or timeout seconds have passed"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id, user_id)
+            if job is None or job["status"] in FINISHED_STATUSES or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    def _claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Fail jobs that used up their attempts on expired leases, then lease the oldest runnable job"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # Their worker died or hung on every attempt; handing them out again would retry forever
+                expired = conn.execute(
+                    """UPDATE jobs
+                       SET status = 'failed', error = 'lease expired after ' || attempts || ' attempt(s)',
+                           lease_until = NULL, updated_at = ?
+                       WHERE status = 'running' AND lease_until < ? AND attempts >= ?
+                       RETURNING id""",
+                    (now, now, self.max_attempts)
+                ).fetchall()
+                row = conn.execute(
+                    """UPDATE jobs
+                       SET status = 'running', worker_id = ?, lease_until = ?, attempts = attempts + 1, updated_at = ?
+                       WHERE id = (
+                           SELECT id FROM jobs
+                           WHERE (status = 'queued' AND run_after <= ?)
+                              OR (status = 'running' AND lease_until < ? AND attempts < ?)
+                           ORDER BY created_at
+                           LIMIT 1
+                       )
+                       RETURNING *""",
+                    (worker_id, now + self.lease_seconds, now, now, now, self.max_attempts)
+                ).fetchone()
+        for job in expired:
+            logging.error(f"Job {job['id']} failed: lease expired on its last attempt")
+        return dict(row) if row else None
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job, including ones whose worker's lease expired"""
+        return await asyncio.to_thread(self._claim, worker_id)
+
+    async def extend_lease(self, job_id: str, worker_id: str) -> bool:
+        """Keep a long-running job leased; False if another worker took it over"""
+        now = time.time()
+        rows = await self._query(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'running' RETURNING id",
+            (now + self.lease_seconds, now, job_id, worker_id)
+        )
+        return bool(rows)
+
+    async def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        await self._query(
+            """UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, lease_until = NULL, updated_at = ?
+               WHERE id = ? AND worker_id = ?""",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id)
+        )
+
+    async def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True):
+        """Record a failed attempt; retryable jobs go back to the queue until JOB_MAX_ATTEMPTS"""
+        now = time.time()
+        await self._query(
+            """UPDATE jobs
+               SET status = CASE WHEN ? AND attempts < ? THEN 'queued' ELSE 'failed' END,
+                   run_after = ? + ? * attempts,
+                   error = ?, lease_until = NULL, updated_at = ?
+               WHERE id = ? AND worker_id = ?""",
+            (retry, self.max_attempts, now, self.retry_delay, error, now, job_id, worker_id)
+        )
+
+    async def purge_finished(self) -> int:
+        """Delete finished jobs older than JOB_RESULT_TTL_SECONDS"""
+        rows = await self._query(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ? RETURNING id",
+            (time.time() - self.result_ttl,)
+        )
+        return len(rows)
+
+    async def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        rows = await self._query("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+
+# Global instance
+job_queue = JobQueue()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Background worker that runs queued resume generation jobs.
+
+Usage (from the backend directory, alongside the API):
+    python job_worker.py                  # JOB_WORKER_CONCURRENCY jobs at a time
+    python job_worker.py --concurrency 4
+
+Run as many worker processes as the LLM/render capacity allows; they share
+the queue at JOB_QUEUE_PATH with the API.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+import logging
+from dotenv import load_dotenv
+load_dotenv()
+
+from logging_setup import setup_logging, stop_logging
+setup_logging()
+
+from fastapi import HTTPException
+from backend_config import db_manager, storage_manager
+from job_queue import job_queue
+from generation import run_job_pipeline
+from lib.agent import close_agent_client
+from html_pdf_generator import cleanup_playwright
+from upload_spool import upload_spool
+from cpu_executor import cpu_executor
+
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+JOB_WORKER_IDLE_SECONDS = float(os.getenv("JOB_WORKER_IDLE_SECONDS", "1"))
+
+
+async def _keep_leased(job_id: str, worker_id: str):
+    """Renew the job lease while it runs so no other worker reclaims it"""
+    while True:
+        await asyncio.sleep(job_queue.lease_seconds / 3)
+        if not await job_queue.extend_lease(job_id, worker_id):
+            logging.warning(f"Job worker {worker_id}: lost lease on job {job_id}")
+            return
+
+
+async def run_job(job: dict, worker_id: str):
+    """Run one claimed job and record its outcome"""
+    job_id = job["id"]
+    logging.info(f"Job {job_id} ({job['kind']}) started, attempt {job['attempts']}")
+    started = time.time()
+    lease = asyncio.create_task(_keep_leased(job_id, worker_id))
+    try:
+        result = await run_job_pipeline(job["kind"], job["user_id"], json.loads(job["payload"]))
+    except HTTPException as e:
+        # Client errors (bad input, unparseable markdown) will fail the same way again; 429 means busy
+        await job_queue.fail(job_id, worker_id, str(e.detail), retry=e.status_code >= 500 or e.status_code == 429)
+        logging.error(f"Job {job_id} failed: {e.detail}")
+    except Exception as e:
+        await job_queue.fail(job_id, worker_id, f"{type(e).__name__}: {str(e)}")
+        logging.exception(f"Job {job_id} failed: {e}")
+    else:
+        await job_queue.complete(job_id, worker_id, result)
+        logging.info(f"Job {job_id} succeeded in {time.time() - started:.1f}s")
+    finally:
+        lease.cancel()
+
+
+async def worker_loop(worker_id: str):
+    while True:
+        job = await job_queue.claim(worker_id)
+        if job is None:
+            await asyncio.sleep(JOB_WORKER_IDLE_SECONDS)
+            continue
+        await run_job(job, worker_id)
+
+
+async def purge_loop():
+    while True:
+        removed = await job_queue.purge_finished()
+        if removed:
+            logging.info(f"Job queue: purged {removed} finished job(s)")
+        await asyncio.sleep(3600)
+
+
+async def main(concurrency: int):
+    logging.info(f"Starting job worker ({concurrency} concurrent jobs, queue {job_queue.path})")
+    if db_manager.is_configured:
+        await db_manager.init_pool()
+    if storage_manager.is_configured:
+        await upload_spool.start()
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    tasks = [asyncio.create_task(worker_loop(f"{prefix}-{uuid.uuid4().hex[:6]}")) for _ in range(concurrency)]
+    tasks.append(asyncio.create_task(purge_loop()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Jobs interrupted here are reclaimed by another worker once their lease expires
+        await cleanup_playwright()
+        await upload_spool.stop()
+        await storage_manager.close()
+        await db_manager.close_pool()
+        await close_agent_client()
+        cpu_executor.shutdown(wait=False)
+        job_queue.close()
+        logging.info("Job worker stopped")
+        stop_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued resume generation jobs")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="jobs to run at once")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.concurrency))
+    except KeyboardInterrupt:
+        pass
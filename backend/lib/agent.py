@@ -1,13 +1,31 @@
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import logging
+from logging_setup import should_log_payload, truncate_payload
 
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
 api_key = os.getenv("OPENROUTER_API_KEY")
 base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
+_client = None
+
+
+def _get_client() -> AsyncOpenAI:
+    """Shared async client; awaiting it lets request cancellation abort the HTTP call"""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+    return _client
+
+
+async def close_agent_client():
+    """Close the shared OpenRouter client"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
 # Resume Writer Agent Instructions - Generate Markdown
 RESUME_AGENT_INSTRUCTIONS = (
     "You are a Resume Writer agent. Your task is to generate a professional CV in MARKDOWN format tailored to a specific job description using candidate information received in JSON format. "
@@ -95,24 +113,50 @@ RESUME_AGENT_INSTRUCTIONS = (
     "Your response should ONLY contain the markdown-formatted resume, nothing else."
 )
 
-async def run_agent(profile_json, job_description, model="openai/gpt-oss-20b:free"):
-    client = OpenAI(base_url=base_url, api_key=api_key)
-    prompt = (
+def _build_prompt(profile_json, job_description):
+    return (
         f"{RESUME_AGENT_INSTRUCTIONS}\n"
         f"Job Description:\n{job_description}\n\n"
         f"Candidate Profile JSON:\n{profile_json}\n"
         "Generate a resume in professional format based on the above information."
     )
+
+async def run_agent(profile_json, job_description, model="openai/gpt-oss-20b:free"):
+    prompt = _build_prompt(profile_json, job_description)
     try:
-        completion = client.chat.completions.create(
+        completion = await _get_client().chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": RESUME_AGENT_INSTRUCTIONS},
                 {"role": "user", "content": prompt}
             ]
         )
-        logging.info(f"Agent Result: {completion.choices[0].message.content}")
-        return completion.choices[0].message.content
+        content = completion.choices[0].message.content
+        logging.info(f"Agent result: {len(content or '')} characters")
+        if should_log_payload():
+            logging.info("Agent payload sample", extra={
+                "prompt": truncate_payload(prompt), "completion": truncate_payload(content or "")
+            })
+        return content
     except Exception as exc:
         logging.error(f"Error: {exc}")
         return None
+
+async def run_agent_stream(profile_json, job_description, model="openai/gpt-oss-20b:free"):
+    """Yield markdown chunks from the agent as they are generated"""
+    prompt = _build_prompt(profile_json, job_description)
+    stream = await _get_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": RESUME_AGENT_INSTRUCTIONS},
+            {"role": "user", "content": prompt}
+        ],
+        stream=True
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Stop the upstream generation when the consumer goes away
+        await stream.response.aclose()
@@ -0,0 +1,126 @@
+"""
+Input size limits, deadlines and cancellation that bound the worst-case cost of a request
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Optional
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from metrics import generation_cancelled_total
+
+# Whole request body, checked from Content-Length and again while the body is read
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(1024 * 1024)))
+# Per-field limits
+MAX_MARKDOWN_CHARS = int(os.getenv("MAX_MARKDOWN_CHARS", "100000"))
+MAX_JOB_DESCRIPTION_CHARS = int(os.getenv("MAX_JOB_DESCRIPTION_CHARS", "50000"))
+MAX_PROFILE_BYTES = int(os.getenv("MAX_PROFILE_BYTES", str(256 * 1024)))
+# Wall-clock budget for parsing one resume
+PARSE_DEADLINE_SECONDS = float(os.getenv("PARSE_DEADLINE_SECONDS", "5"))
+# Wall-clock budget for one synchronous generation request (0 = none)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "180"))
+# How often a running generation checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "1"))
+
+
+def check_content_length(content_length: Optional[str]):
+    """Reject a request whose declared body size is over MAX_REQUEST_BYTES"""
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {MAX_REQUEST_BYTES} bytes")
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware enforcing MAX_REQUEST_BYTES on every request body.
+
+    A declared Content-Length is rejected up front; chunked bodies are counted
+    as the app reads them, and the read fails with 413 once they pass the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length", b"").decode("latin-1")
+        try:
+            check_content_length(content_length)
+        except HTTPException as e:
+            await JSONResponse(status_code=e.status_code, content={"detail": e.detail})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > MAX_REQUEST_BYTES:
+                    # Raised into the body read, so FastAPI answers with the 413
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds {MAX_REQUEST_BYTES} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def enforce_max_length(field: str, value: str, limit: int):
+    """Raise 413 if a text field is longer than limit characters"""
+    if value and len(value) > limit:
+        raise HTTPException(status_code=413, detail=f"{field} exceeds maximum size of {limit} characters")
+
+
+def enforce_max_bytes(field: str, value: bytes, limit: int):
+    """Raise 413 if a binary/encoded field is larger than limit bytes"""
+    if value and len(value) > limit:
+        raise HTTPException(status_code=413, detail=f"{field} exceeds maximum size of {limit} bytes")
+
+
+async def read_upload_limited(upload: UploadFile, field: str, limit: int) -> bytes:
+    """Read an uploaded file, stopping as soon as it exceeds limit bytes"""
+    content = await upload.read(limit + 1)
+    enforce_max_bytes(field, content, limit)
+    return content
+
+
+def parse_deadline() -> float:
+    """Absolute wall-clock deadline for a parse starting now"""
+    return time.time() + PARSE_DEADLINE_SECONDS
+
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def run_cancellable(request: Request, work: Awaitable[Any], name: str) -> Any:
+    """Await work, cancelling it when the client disconnects or REQUEST_DEADLINE_SECONDS passes.
+
+    Cancellation propagates into the pipeline (LLM call, browser page, upload
+    wait), which releases its resources before this returns.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher},
+            timeout=REQUEST_DEADLINE_SECONDS if REQUEST_DEADLINE_SECONDS > 0 else None,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if task in done:
+            return task.result()
+
+        reason = "client_disconnect" if watcher in done else "deadline"
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        generation_cancelled_total.inc(pipeline=name, reason=reason)
+        if reason == "deadline":
+            raise HTTPException(status_code=504, detail=f"Generation did not finish within {REQUEST_DEADLINE_SECONDS:g} seconds")
+        # Nobody is listening; 499 only shows up in logs and metrics
+        raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        watcher.cancel()
+        if not task.done():
+            # The handler itself was cancelled (e.g. server shutdown)
+            task.cancel()
@@ -0,0 +1,95 @@
+"""
+Filesystem storage backend for running the stack offline.
+
+PDFs are written under LOCAL_STORAGE_DIR using the same user_id/<name>.pdf
+layout as the Supabase bucket; main.py serves that directory at
+/local-storage so the returned URLs work in the browser.
+"""
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List
+from backends import StorageBackend
+
+
+class LocalStorageManager(StorageBackend):
+    def __init__(self):
+        self.root = os.path.abspath(os.getenv(
+            "LOCAL_STORAGE_DIR",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_storage")
+        ))
+        self.public_url = os.getenv("LOCAL_STORAGE_PUBLIC_URL", "http://localhost:8000/local-storage").rstrip("/")
+        logging.info(f"Local storage backend at {self.root}")
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    def _full_path(self, file_path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, file_path))
+        if not full_path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage path: {file_path}")
+        return full_path
+
+    def get_public_url(self, file_path: str) -> str:
+        return f"{self.public_url}/{file_path}"
+
+    async def object_age(self, file_path: str) -> Optional[float]:
+        try:
+            modified = await asyncio.to_thread(os.path.getmtime, self._full_path(file_path))
+        except FileNotFoundError:
+            return None
+        return max(0.0, time.time() - modified)
+
+    def _write(self, full_path: str, pdf_bytes: bytes):
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path + ".tmp", "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(full_path + ".tmp", full_path)
+
+    async def upload_pdf(self, pdf_bytes: bytes, user_id: str, object_name: str) -> Optional[str]:
+        """Write the PDF to disk and return its URL"""
+        file_path = self.get_object_path(user_id, object_name)
+        try:
+            await asyncio.to_thread(self._write, self._full_path(file_path), pdf_bytes)
+        except Exception as e:
+            logging.error(f"Error writing PDF to local storage: {str(e)}")
+            return None
+        return self.get_public_url(file_path)
+
+    def _delete(self, full_paths: List[str]):
+        for full_path in full_paths:
+            try:
+                os.remove(full_path)
+            except FileNotFoundError:
+                pass
+
+    async def delete_pdfs(self, user_id: str, object_names: List[str]) -> bool:
+        try:
+            full_paths = [self._full_path(self.get_object_path(user_id, name)) for name in object_names]
+            await asyncio.to_thread(self._delete, full_paths)
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting PDF from local storage: {str(e)}")
+            return False
+
+    def _list(self, user_id: str) -> list:
+        user_dir = self._full_path(user_id)
+        if not os.path.isdir(user_dir):
+            return []
+        objects = []
+        for entry in sorted(os.scandir(user_dir), key=lambda e: e.name):
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                modified = datetime.fromtimestamp(entry.stat().st_mtime, timezone.utc)
+                objects.append({"name": entry.name, "created_at": modified.isoformat()})
+        return objects
+
+    async def list_user_pdfs(self, user_id: str, limit: int = 100, offset: int = 0) -> list:
+        try:
+            objects = await asyncio.to_thread(self._list, user_id)
+        except Exception as e:
+            logging.error(f"Error listing user PDFs: {str(e)}")
+            return []
+        return objects[offset:offset + limit]
@@ -1,11 +1,15 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException
+from logging_setup import setup_logging, stop_logging, request_id_var
+setup_logging()
+
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, Request, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response, HTMLResponse
+from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from lib.agent import run_agent
+from lib.agent import run_agent_stream, close_agent_client
 
 def create_default_profile_template(user_info: dict) -> dict:
     """Create a default profile template for new users"""
@@ -29,43 +33,76 @@ def create_default_profile_template(user_info: dict) -> dict:
         "projects": [],
         "interests": []
     }
-from auth import get_current_user
-from database_supabase_api import supabase_db_manager as db_manager
+from auth import get_current_user, close_auth_client
+from backend_config import db_manager, storage_manager, STORAGE_BACKEND, DATABASE_BACKEND
+from backends import profile_etag
 from html_pdf_generator import html_pdf_generator, cleanup_playwright
-from flexible_resume_processor import FlexibleResumeProcessor
-from storage import storage_manager
+from flexible_resume_processor import StreamingResumeProcessor
+from generation import (
+    enforce_profile_size, generate_flexible_cv, generate_agent_resume, generate_pdf_from_markdown, render_html_preview,
+    preview_hash
+)
+from pipeline import stage_limiter, parse_resume, ADMISSION_MAX_RETRY_AFTER_SECONDS
+from metrics import (
+    registry, Gauge, http_requests_total, http_request_duration_seconds, http_requests_in_flight,
+    admission_rejected_total, generation_cancelled_total
+)
+from ttl_cache import named_caches
+from job_queue import job_queue, JOB_MAX_WAIT_SECONDS, JOB_MAX_QUEUED
+from idempotency import idempotency_store, run_idempotent
+from upload_spool import upload_spool
+from cpu_executor import cpu_executor
+from limits import (
+    MAX_MARKDOWN_CHARS, MAX_JOB_DESCRIPTION_CHARS, MAX_PROFILE_BYTES,
+    RequestSizeLimitMiddleware, enforce_max_length, enforce_max_bytes, read_upload_limited, run_cancellable
+)
 import asyncio
 import json
+import logging
 import uuid
 import io
 import os
 import signal
 import sys
+import time
 from typing import Optional
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Starting CV Builder API...")
+    logging.info("Starting CV Builder API...")
     
-    if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
-        print("✅ Supabase configured")
+    logging.info(f"Backends: storage={STORAGE_BACKEND}, database={DATABASE_BACKEND}")
+    if db_manager.is_configured:
+        await db_manager.init_pool()
     else:
-        print("⚠️  Supabase not configured - some features will be disabled")
+        logging.warning("Database not configured - some features will be disabled")
+    
+    if storage_manager.is_configured:
+        await upload_spool.start()
     
     yield
     
     # Shutdown
-    print("🛑 Shutting down CV Builder API...")
+    logging.info("Shutting down CV Builder API...")
     try:
         await asyncio.wait_for(cleanup_playwright(), timeout=15.0)
-        print("✅ Cleanup completed successfully")
+        await upload_spool.stop()
+        await storage_manager.close()
+        await db_manager.close_pool()
+        await close_auth_client()
+        await close_agent_client()
+        job_queue.close()
+        idempotency_store.close()
+        logging.info("Cleanup completed successfully")
     except asyncio.TimeoutError:
-        print("⚠️  Cleanup timed out, forcing shutdown")
+        logging.warning("Cleanup timed out, forcing shutdown")
     except Exception as e:
-        print(f"❌ Error during cleanup: {e}")
+        logging.error(f"Error during cleanup: {e}")
     finally:
-        print("🛑 Shutdown complete")
+        cpu_executor.shutdown(wait=False)
+        logging.info("Shutdown complete")
+        stop_logging()
 
 app = FastAPI(
     title="CV Builder API",
@@ -74,6 +111,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Body size limit; added before CORS so 413 responses still carry CORS headers
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -81,138 +121,154 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID", "Retry-After", "Idempotent-Replayed"],
 )
 
+# Serve PDFs written by the local storage backend
+if STORAGE_BACKEND == "local":
+    os.makedirs(storage_manager.root, exist_ok=True)
+    app.mount("/local-storage", StaticFiles(directory=storage_manager.root), name="local-storage")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and observe latency per route template (not raw path, to bound cardinality)"""
+    started = time.perf_counter()
+    http_requests_in_flight.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        http_requests_total.inc(route=route, method=request.method, status=str(status))
+        http_request_duration_seconds.observe(time.perf_counter() - started, route=route, method=request.method)
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag every log line of a request with its id (X-Request-ID if the caller sent one); registered last so it runs outermost"""
+    request_id = request.headers.get("x-request-id", "")[:64] or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+def _runtime_gauges():
+    """Scrape-time gauges over state owned by other modules"""
+    registry.register(Gauge("cpu_executor_pending", "Tasks submitted to the CPU executor and not finished",
+                            callback=lambda: {(): cpu_executor.stats()["pending"]}))
+    registry.register(Gauge("cpu_executor_queue_depth", "CPU executor tasks waiting for a worker",
+                            callback=lambda: {(): cpu_executor.queue_depth}))
+    registry.register(Gauge("upload_spool_pending", "PDF uploads waiting for a spool worker",
+                            callback=lambda: {(): upload_spool.pending}))
+    registry.register(Gauge("browser_connected", "Whether the Playwright browser is running or connected",
+                            callback=lambda: {(): 1 if html_pdf_generator.is_connected else 0}))
+    registry.register(Gauge("browser_open_pages", "Playwright pages currently rendering",
+                            callback=lambda: {(): html_pdf_generator.open_pages}))
+    registry.register(Gauge("cache_hit_ratio", "Hit ratio of in-memory caches since start", ("cache",),
+                            callback=lambda: {(name,): cache.hit_ratio for name, cache in named_caches().items()}))
+    registry.register(Gauge("cache_entries", "Entries held by in-memory caches", ("cache",),
+                            callback=lambda: {(name,): len(cache) for name, cache in named_caches().items()}))
+    return registry.register(Gauge("job_queue_jobs", "Generation jobs by status", ("status",)))
+
+job_queue_jobs = _runtime_gauges()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    for status in ("queued", "running", "succeeded", "failed"):
+        job_queue_jobs.set(0, status=status)
+    for status, count in (await job_queue.counts()).items():
+        job_queue_jobs.set(count, status=status)
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "CV Builder API", "version": "1.0.0"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "API is running"}
+    return {
+        "status": "healthy",
+        "message": "API is running",
+        "executor": cpu_executor.stats(),
+        "pipeline": stage_limiter.stats()
+    }
 
 @app.post("/generate-ai-flexible-cv/")
 async def generate_ai_flexible_cv(
+    http_request: Request,
     job_offer_url: str = Form(...),
     profile_json: UploadFile = File(...),
+    run_async: bool = Query(False, alias="async"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Generate CV using AI agent + flexible parser workflow: JSON profile → AI agent → markdown → flexible parser → PDF"""
+    """Generate CV using AI agent + flexible parser workflow: JSON profile → AI agent → markdown → flexible parser → PDF
+
+    With ?async=true the job is queued for a worker and 202 is returned with a job id to poll.
+    """
     try:
-        print(f"🎯 Generating AI flexible CV for user {current_user['id']}")
-        print(f"🔗 Job offer URL: {job_offer_url}")
+        logging.info(f"Generating AI flexible CV for user {current_user['id']}")
+        logging.info(f"Job offer URL: {job_offer_url}")
         
         # Read and parse JSON profile
-        profile_content = await profile_json.read()
+        profile_content = await read_upload_limited(profile_json, "profile_json", MAX_PROFILE_BYTES)
         profile_data = json.loads(profile_content.decode('utf-8'))
         
-        print(f"📄 Profile data keys: {list(profile_data.keys())}")
-        
-        # Step 1: Use AI agent to generate markdown from JSON profile
-        print("🤖 Step 1: AI Agent generating markdown from JSON profile...")
-        markdown_content = await run_agent(profile_data, job_offer_url)
-        
-        if not markdown_content:
-            raise HTTPException(status_code=500, detail="AI agent failed to generate markdown")
-        
-        print(f"✅ AI agent generated markdown: {len(markdown_content)} characters")
-        print(f"📝 Markdown preview: {markdown_content[:200]}...")
-        
-        # Step 2: Use flexible parser to process markdown
-        print("🔧 Step 2: Flexible parser processing markdown...")
-        processor = FlexibleResumeProcessor()
-        structured_data = processor.process_resume_content(markdown_content, profile_json)
-        
-        print(f"✅ Processed data keys: {list(structured_data.keys())}")
-        print(f"📊 Experience entries: {len(structured_data.get('experience', []))}")
-        print(f"🏷️  Tags: {len(structured_data.get('tags', []))}")
-        print(f"🎓 Education entries: {len(structured_data.get('education', []))}")
-        print(f"📜 Certifications: {len(structured_data.get('certifications', []))}")
-        print(f"🚀 Projects: {len(structured_data.get('projects', []))}")
-        
-        # Step 3: Generate PDF using template
-        print("🎨 Step 3: Rendering template...")
-        template_path = "resume_template.html"
-        if not os.path.exists(template_path):
-            raise HTTPException(status_code=500, detail="Template file not found")
-        
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        # Simple template processing
-        html_content = template_content
-        for key, value in structured_data.items():
-            if isinstance(value, str):
-                html_content = html_content.replace(f'{{{{{key}}}}}', value)
-            elif isinstance(value, (int, float)):
-                html_content = html_content.replace(f'{{{{{key}}}}}', str(value))
-            elif value is None:
-                html_content = html_content.replace(f'{{{{{key}}}}}', '')
-        
-        # Check if template syntax is still present
-        if "{{" in html_content and "}}" in html_content:
-            print("❌ Template syntax still present in rendered HTML!")
-            lines = html_content.split('\n')
-            for i, line in enumerate(lines):
-                if "{{" in line and "}}" in line:
-                    print(f"  Line {i+1}: {line.strip()}")
-            raise HTTPException(status_code=500, detail="Template syntax not fully processed")
-        else:
-            print("✅ Template syntax successfully processed!")
-        
-        # Step 4: Generate PDF using Playwright
-        print("📄 Step 4: Generating PDF with Playwright...")
-        pdf_bytes = await html_pdf_generator.generate_pdf_from_html(html_content, current_user['id'])
-        
-        if not pdf_bytes:
-            raise HTTPException(status_code=500, detail="PDF generation failed")
-        
-        print(f"✅ PDF generated successfully: {len(pdf_bytes)} bytes")
-        
-        # Step 5: Store in database
-        print("💾 Step 5: Storing in database...")
-        resume_id = str(uuid.uuid4())
-        
-        # Store PDF in Supabase Storage
-        storage_url = await storage_manager.upload_pdf(pdf_bytes, current_user['id'], resume_id)
-        
-        if not storage_url:
-            raise HTTPException(status_code=500, detail="Failed to store PDF")
-        
-        print(f"✅ PDF stored successfully: {storage_url}")
-        
-        # Store resume metadata in database
-        if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
-            try:
-                await db_manager.save_resume_metadata(current_user['id'], resume_id, job_offer_url)
-                print("✅ Resume metadata saved")
-            except Exception as e:
-                print(f"⚠️  Failed to save resume metadata: {e}")
-            
-            try:
-                await db_manager.update_resume_storage_url(current_user['id'], resume_id, storage_url)
-                print("✅ Resume storage URL updated in database")
-            except Exception as e:
-                print(f"⚠️  Failed to update resume storage URL: {e}")
-        else:
-            print("⚠️  Database not configured - resume metadata not saved")
+        if run_async:
+            return await enqueue_job("flexible_cv", current_user['id'], {"profile": profile_data, "job_offer_url": job_offer_url})
         
-        return {
-            "message": "AI Flexible CV generated and stored successfully",
-            "storage_url": storage_url,
-            "resume_id": resume_id,
-            "resume": markdown_content  # Return the generated markdown for display
-        }
+        return await run_cancellable(
+            http_request, generate_flexible_cv(current_user['id'], profile_data, job_offer_url), "flexible_cv"
+        )
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        print(f"❌ Error generating AI flexible CV: {e}")
-        import traceback
-        traceback.print_exc()
+        logging.exception(f"Error generating AI flexible CV: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating AI flexible CV: {str(e)}")
 
+async def enqueue_job(kind: str, user_id: str, payload: dict) -> JSONResponse:
+    """Queue a generation job for the workers and answer 202 with where to poll"""
+    if JOB_MAX_QUEUED > 0 and (await job_queue.counts()).get("queued", 0) >= JOB_MAX_QUEUED:
+        admission_rejected_total.inc(pipeline=kind, stage="job_queue")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many queued jobs, please retry later",
+            headers={"Retry-After": str(ADMISSION_MAX_RETRY_AFTER_SECONDS)}
+        )
+    job = await job_queue.enqueue(kind, user_id, payload)
+    status_url = f"/jobs/{job['id']}"
+    logging.info(f"Queued {kind} job {job['id']} for user {user_id}")
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["id"], "status": job["status"], "status_url": status_url},
+        headers={"Location": status_url}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=JOB_MAX_WAIT_SECONDS),
+    current_user: dict = Depends(get_current_user)
+):
+    """Status and, once finished, result of a generation job.
+
+    Pass wait=N to long-poll up to N seconds for the job to finish.
+    """
+    if wait:
+        job = await job_queue.wait(job_id, current_user['id'], wait)
+    else:
+        job = await job_queue.get(job_id, current_user['id'])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_queue.to_response(job)
+
 @app.post("/validate-url/")
 async def validate_url(
     request: dict,
@@ -227,7 +283,7 @@ async def validate_url(
         # Add protocol if missing
         if not url.startswith(("http://", "https://")):
             url = "https://" + url
-            print(f"🔧 Added https:// protocol to URL: {url}")
+            logging.info(f"Added https:// protocol to URL: {url}")
         
         # Basic URL format validation
         if not url.startswith(("http://", "https://")):
@@ -235,7 +291,7 @@ async def validate_url(
         
         # Special handling for LinkedIn URLs
         if 'linkedin.com/jobs' in url:
-            print(f"✅ LinkedIn job URL detected: {url}")
+            logging.info(f"LinkedIn job URL detected: {url}")
             return {
                 "url": url,
                 "accessible": True,
@@ -270,7 +326,7 @@ async def validate_url(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error validating URL: {e}")
+        logging.error(f"Error validating URL: {e}")
         raise HTTPException(status_code=500, detail=f"URL validation failed: {str(e)}")
 
 @app.post("/validate-profile/")
@@ -336,15 +392,22 @@ async def validate_profile(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error validating profile: {e}")
+        logging.error(f"Error validating profile: {e}")
         raise HTTPException(status_code=500, detail=f"Profile validation failed: {str(e)}")
 
 @app.post("/generate-resume-agent/")
 async def generate_resume_agent(
     request: dict,
+    http_request: Request,
+    run_async: bool = Query(False, alias="async"),
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Generate resume using agent1 and flexible processor"""
+    """Generate resume using agent1 and flexible processor
+
+    With ?async=true the job is queued for a worker and 202 is returned with a job id to poll.
+    Retries sent with the same Idempotency-Key get the first response back without re-running.
+    """
     try:
         profile = request.get("profile", {})
         job_description = request.get("job_description", "")
@@ -355,107 +418,101 @@ async def generate_resume_agent(
         if not job_description or len(job_description.strip()) < 50:
             raise HTTPException(status_code=400, detail="Job description is required and must be at least 50 characters")
         
-        print(f"🎯 Generating resume with Agent 1 and flexible processor for user {current_user['id']}")
-        print(f"📝 Job description length: {len(job_description)} characters")
-        
-        # Convert profile to JSON string for agent
-        import json
-        profile_json = json.dumps(profile, ensure_ascii=False)
-        
-        # Use Agent 1
-        print("🤖 Using Agent 1...")
-        markdown_content = await run_agent(profile_json, job_description)
-        
-        if not markdown_content:
-            raise HTTPException(status_code=500, detail="Agent failed to generate markdown")
-        
-        print(f"✅ Agent generated markdown: {len(markdown_content)} characters")
-        
-        # Process with flexible parser
-        print("🔧 Processing with flexible parser...")
-        # Debug: Print profile structure
-        print(f"📊 Profile structure: {list(profile.keys())}")
-        if 'personal_info' in profile:
-            print(f"📊 Personal info: {list(profile['personal_info'].keys())}")
-        
-        processor_obj = FlexibleResumeProcessor()
-        structured_data = processor_obj.process_resume_content(markdown_content, profile)
-        
-        # Ensure contact info from profile takes priority over markdown extraction
-        if 'personal_info' in profile:
-            personal_info = profile['personal_info']
-            structured_data.update({
-                'name': personal_info.get('full_name', structured_data.get('name', '')),
-                'title': personal_info.get('title', '') or personal_info.get('job_title', '') or structured_data.get('title', ''),
-                'email': personal_info.get('email', structured_data.get('email', '')),
-                'phone': personal_info.get('phone', structured_data.get('phone', '')),
-                'location': personal_info.get('location', structured_data.get('location', '')),
-                'linkedin': personal_info.get('linkedin_url', '') or personal_info.get('linkedin', '') or structured_data.get('linkedin', ''),
-                'github': personal_info.get('github_url', '') or personal_info.get('github', '') or structured_data.get('github', '')
-            })
-        
-        # Debug: Print extracted contact info
-        print(f"📞 Extracted contact info: name='{structured_data['name']}', email='{structured_data['email']}', phone='{structured_data['phone']}', location='{structured_data['location']}'")
-        
-        # Generate PDF
-        print("🎨 Generating PDF...")
-        template_path = "resume_template.html"
-        if not os.path.exists(template_path):
-            raise HTTPException(status_code=500, detail="Template file not found")
-        
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        # Handlebars template processing
-        from pybars import Compiler
-        compiler = Compiler()
-        template = compiler.compile(template_content)
-        html_content = template(structured_data)
-        
-        # Generate PDF using Playwright
-        pdf_bytes = await html_pdf_generator.generate_pdf_from_html(html_content, current_user['id'])
-        
-        if not pdf_bytes:
-            raise HTTPException(status_code=500, detail="PDF generation failed")
-        
-        # Store in database
-        resume_id = str(uuid.uuid4())
-        storage_url = await storage_manager.upload_pdf(pdf_bytes, current_user['id'], resume_id)
-        
-        if not storage_url:
-            raise HTTPException(status_code=500, detail="Failed to store PDF")
-        
-        # Store resume metadata
-        if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
-            try:
-                await db_manager.save_resume_metadata(current_user['id'], resume_id, job_description[:100] + "..." if len(job_description) > 100 else job_description)
-                await db_manager.update_resume_storage_url(current_user['id'], resume_id, storage_url)
-            except Exception as e:
-                print(f"⚠️  Failed to save resume metadata: {e}")
+        enforce_max_length("job_description", job_description, MAX_JOB_DESCRIPTION_CHARS)
         
-        return {
-            "message": "Resume generated successfully using Agent 1",
-            "markdown": markdown_content,
-            "resume": markdown_content,  # For backward compatibility
-            "resume_id": resume_id,
-            "storage_url": storage_url,
-            "agent_used": "agent1"
-        }
+        logging.info(f"Generating resume with Agent 1 and flexible processor for user {current_user['id']}")
+        logging.info(f"Job description length: {len(job_description)} characters")
+        
+        async def generate():
+            if run_async:
+                enforce_profile_size(profile)
+                return await enqueue_job("resume_agent", current_user['id'], {"profile": profile, "job_description": job_description})
+            return await run_cancellable(
+                http_request, generate_agent_resume(current_user['id'], profile, job_description), "resume_agent"
+            )
+        
+        return await run_idempotent(
+            idempotency_key, current_user['id'], "generate-resume-agent",
+            {"body": request, "async": run_async}, generate
+        )
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error generating resume: {e}")
-        import traceback
-        traceback.print_exc()
+        logging.exception(f"Error generating resume: {e}")
         raise HTTPException(status_code=500, detail=f"Resume generation failed: {str(e)}")
 
+@app.post("/generate-resume-agent/stream")
+async def generate_resume_agent_stream(
+    request: dict,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream resume sections as NDJSON while the agent is still generating.
+
+    Each closed ``###`` section is emitted as ``{"section": ..., "data": {...}}``
+    as soon as it is parsed; the last line is ``{"done": true, ...}`` with the
+    full markdown and structured result.
+    """
+    profile = request.get("profile", {})
+    job_description = request.get("job_description", "")
+
+    if not profile:
+        raise HTTPException(status_code=400, detail="Profile data is required")
+
+    if not job_description or len(job_description.strip()) < 50:
+        raise HTTPException(status_code=400, detail="Job description is required and must be at least 50 characters")
+
+    enforce_max_length("job_description", job_description, MAX_JOB_DESCRIPTION_CHARS)
+
+    logging.info(f"Streaming resume generation for user {current_user['id']}")
+    profile_json = enforce_profile_size(profile)
+    # Streaming bypasses the pipeline but competes for the same LLM and parse slots
+    stage_limiter.admit(["llm", "parse"], "resume_agent_stream")
+
+    async def event_stream():
+        processor_obj = StreamingResumeProcessor(profile)
+        try:
+            async with stage_limiter.slot("llm", "resume_agent_stream"):
+                async for chunk in run_agent_stream(profile_json, job_description):
+                    for section, data in processor_obj.feed(chunk):
+                        yield json.dumps({"section": section, "data": data}, ensure_ascii=False) + "\n"
+
+            for section, data in processor_obj.flush():
+                yield json.dumps({"section": section, "data": data}, ensure_ascii=False) + "\n"
+
+            # Full parse on the CPU executor under the parse deadline, like the pipelines
+            async with stage_limiter.slot("parse", "resume_agent_stream"):
+                resume = await parse_resume(processor_obj.markdown, profile)
+            if isinstance(profile, dict) and profile.get('personal_info'):
+                resume.apply_personal_info(profile['personal_info'])
+
+            yield json.dumps({
+                "done": True,
+                "markdown": processor_obj.markdown,
+                "structured": resume.to_context()
+            }, ensure_ascii=False) + "\n"
+        except asyncio.CancelledError:
+            # Client went away; the upstream LLM stream is closed on the way out
+            generation_cancelled_total.inc(pipeline="resume_agent_stream", reason="client_disconnect")
+            raise
+        except HTTPException as e:
+            # Headers are already sent, so errors such as a parse timeout can only be reported in-band
+            logging.error(f"Error streaming resume: {e.detail}")
+            yield json.dumps({"done": True, "error": e.detail}) + "\n"
+        except Exception as e:
+            logging.error(f"Error streaming resume: {e}")
+            yield json.dumps({"done": True, "error": f"Resume generation failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 # Profile completion endpoint removed - functionality not needed
 
 # New: Generate PDF directly from edited markdown
 @app.post("/pdf-from-markdown/")
 async def pdf_from_markdown(
     request: dict,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     """Generate a PDF from user-edited markdown.
@@ -463,6 +520,8 @@ async def pdf_from_markdown(
     Expects:
     - markdown: string (required)
     - profile: dict (optional; used to enrich/override extracted fields)
+
+    Retries sent with the same Idempotency-Key get the first response back without re-running.
     """
     try:
         markdown = request.get("markdown", "")
@@ -471,67 +530,59 @@ async def pdf_from_markdown(
         if not markdown or len(markdown.strip()) < 10:
             raise HTTPException(status_code=400, detail="Markdown content is required")
 
-        # Process markdown into structured data using the flexible processor
-        processor_obj = FlexibleResumeProcessor()
-        structured_data = processor_obj.process_resume_content(markdown, profile or {})
-
-        # Ensure personal info from profile takes precedence, if provided
-        if isinstance(profile, dict) and profile.get("personal_info"):
-            personal_info = profile["personal_info"]
-            structured_data.update({
-                'name': personal_info.get('full_name', structured_data.get('name', '')),
-                'title': personal_info.get('title', '') or personal_info.get('job_title', '') or structured_data.get('title', ''),
-                'email': personal_info.get('email', structured_data.get('email', '')),
-                'phone': personal_info.get('phone', structured_data.get('phone', '')),
-                'location': personal_info.get('location', structured_data.get('location', '')),
-                'linkedin': personal_info.get('linkedin_url', '') or personal_info.get('linkedin', '') or structured_data.get('linkedin', ''),
-                'github': personal_info.get('github_url', '') or personal_info.get('github', '') or structured_data.get('github', '')
-            })
-
-        # Compile Handlebars template
-        template_path = "resume_template.html"
-        if not os.path.exists(template_path):
-            raise HTTPException(status_code=500, detail="Template file not found")
-
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-
-        from pybars import Compiler
-        compiler = Compiler()
-        template = compiler.compile(template_content)
-        html_content = template(structured_data)
-
-        # Generate PDF and upload
-        pdf_bytes = await html_pdf_generator.generate_pdf_from_html(html_content, current_user['id'])
-        if not pdf_bytes:
-            raise HTTPException(status_code=500, detail="PDF generation failed")
-
-        resume_id = str(uuid.uuid4())
-        storage_url = await storage_manager.upload_pdf(pdf_bytes, current_user['id'], resume_id)
-        if not storage_url:
-            raise HTTPException(status_code=500, detail="Failed to store PDF")
-
-        # Best-effort: store metadata if DB configured
-        if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
-            try:
-                await db_manager.save_resume_metadata(current_user['id'], resume_id, "Edited markdown export")
-                await db_manager.update_resume_storage_url(current_user['id'], resume_id, storage_url)
-            except Exception as e:
-                print(f"⚠️  Failed to save resume metadata for edited markdown: {e}")
+        enforce_max_length("markdown", markdown, MAX_MARKDOWN_CHARS)
+        if profile:
+            enforce_profile_size(profile)
 
-        return {
-            "message": "PDF generated from edited markdown",
-            "resume_id": resume_id,
-            "storage_url": storage_url
-        }
+        return await run_idempotent(
+            idempotency_key, current_user['id'], "pdf-from-markdown", request,
+            lambda: run_cancellable(
+                http_request, generate_pdf_from_markdown(current_user['id'], markdown, profile or {}), "markdown_pdf"
+            )
+        )
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error generating PDF from markdown: {e}")
-        import traceback
-        traceback.print_exc()
+        logging.exception(f"Error generating PDF from markdown: {e}")
         raise HTTPException(status_code=500, detail=f"PDF from markdown failed: {str(e)}")
 
+@app.post("/preview-html/")
+async def preview_html(
+    request: dict,
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Render markdown to resume HTML for the live editor preview.
+
+    Same parser and template as /pdf-from-markdown/ but without the browser,
+    upload or database write. Results are cached by content hash and the hash
+    is returned as the ETag.
+    """
+    try:
+        markdown = request.get("markdown", "")
+        profile = request.get("profile", {})
+
+        if not markdown or len(markdown.strip()) < 10:
+            raise HTTPException(status_code=400, detail="Markdown content is required")
+
+        enforce_max_length("markdown", markdown, MAX_MARKDOWN_CHARS)
+        if profile:
+            enforce_profile_size(profile)
+
+        # The hash depends only on the inputs, so a revalidation is answered without rendering
+        key = preview_hash(markdown, profile or {})
+        etag = f'"{key}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        html = await render_html_preview(current_user['id'], markdown, profile or {}, key)
+        return HTMLResponse(content=html, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.exception(f"Error rendering HTML preview: {e}")
+        raise HTTPException(status_code=500, detail=f"HTML preview failed: {str(e)}")
+
 # Profile response processing endpoint removed - functionality not needed
 
 @app.post("/create-default-profile/")
@@ -540,12 +591,10 @@ async def create_default_profile_endpoint(
 ):
     """Create a default profile template for new users"""
     try:
-        print(f"👤 Creating default profile for user {current_user['id']}")
+        logging.info(f"Creating default profile for user {current_user['id']}")
         
         # Extract user info from current_user
-        print(f"🔍 User data structure: {current_user}")
         user_metadata = current_user.get("user_metadata", {})
-        print(f"🔍 User metadata: {user_metadata}")
         
         # Try to get full_name from various possible locations
         full_name = (
@@ -561,18 +610,16 @@ async def create_default_profile_endpoint(
             "email": current_user.get("email", "")
         }
         
-        print(f"🔍 Extracted user info: {user_info}")
-        
         # Create default profile template
         default_profile = create_default_profile_template(user_info)
         
         # Save to database if configured
-        if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+        if db_manager.is_configured:
             try:
                 await db_manager.upsert_profile(current_user['id'], default_profile)
-                print("✅ Default profile saved to database")
+                logging.info("Default profile saved to database")
             except Exception as e:
-                print(f"⚠️  Failed to save default profile to database: {e}")
+                logging.warning(f"Failed to save default profile to database: {e}")
         
         return {
             "message": "Default profile created successfully",
@@ -582,37 +629,127 @@ async def create_default_profile_endpoint(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error creating default profile: {e}")
+        logging.error(f"Error creating default profile: {e}")
         raise HTTPException(status_code=500, detail=f"Default profile creation failed: {str(e)}")
 
 # Profile validation endpoint removed - functionality not needed
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
 @app.get("/profile")
 async def get_profile_endpoint(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Get user profile from database"""
+    """Get user profile from database (supports ETag / If-None-Match)"""
     try:
-        print(f"🔍 Getting profile for user {current_user['id']}")
+        logging.info(f"Getting profile for user {current_user['id']}")
         
-        if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+        if not db_manager.is_configured:
             raise HTTPException(status_code=404, detail="Database not configured")
         
-        # Get profile from database
-        profile_data = await db_manager.get_profile(current_user['id'])
+        # Get profile from cache or database
+        profile_data, etag = await db_manager.get_profile_with_etag(current_user['id'])
         
         if not profile_data:
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        print(f"✅ Profile found for user {current_user['id']}")
-        return profile_data.get('profile', {})
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        logging.info(f"Profile found for user {current_user['id']}")
+        return JSONResponse(content=profile_data.get('profile', {}), headers=headers)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting profile: {e}")
+        logging.error(f"Error getting profile: {e}")
         raise HTTPException(status_code=500, detail=f"Profile retrieval failed: {str(e)}")
 
+@app.patch("/profile")
+async def patch_profile_endpoint(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    if_match: Optional[str] = Header(None)
+):
+    """Apply a JSON merge patch (RFC 7396) to the user's profile.
+
+    Send the ETag from GET /profile as If-Match to get 412 instead of
+    overwriting a concurrent edit.
+    """
+    try:
+        body = await request.body()
+        enforce_max_bytes("profile", body, MAX_PROFILE_BYTES)
+        try:
+            patch = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON merge patch")
+        if not isinstance(patch, dict):
+            raise HTTPException(status_code=400, detail="Merge patch must be a JSON object")
+
+        if not db_manager.is_configured:
+            raise HTTPException(status_code=404, detail="Database not configured")
+
+        expected_version = None
+        if if_match:
+            # Another worker may have patched the profile since this one cached it
+            current, etag = await db_manager.get_profile_with_etag(current_user['id'], fresh=True)
+            if not current:
+                raise HTTPException(status_code=404, detail="Profile not found")
+            if not etag_matches(if_match, etag):
+                raise HTTPException(status_code=412, detail="Profile was modified since it was loaded")
+            expected_version = current.get('version')
+
+        # Merge happens in the database, so only the edit travels over the wire
+        updated = await db_manager.patch_profile(current_user['id'], patch, expected_version)
+        if not updated:
+            if expected_version is not None:
+                raise HTTPException(status_code=412, detail="Profile was modified since it was loaded")
+            raise HTTPException(status_code=404, detail="Profile not found")
+
+        profile = updated.get('profile', {})
+        logging.info(f"Profile patched for user {current_user['id']}")
+        return JSONResponse(content=profile, headers={"ETag": profile_etag(profile), "Cache-Control": "private, no-cache"})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error patching profile: {e}")
+        raise HTTPException(status_code=500, detail=f"Profile update failed: {str(e)}")
+
+@app.get("/resumes")
+async def list_resumes_endpoint(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the user's resume history, newest first, one page at a time.
+
+    Pass the returned next_cursor as cursor to fetch the following page.
+    """
+    try:
+        if not db_manager.is_configured:
+            raise HTTPException(status_code=404, detail="Database not configured")
+
+        try:
+            items, next_cursor = await db_manager.list_resumes_page(current_user['id'], limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return {"items": items, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error listing resumes: {e}")
+        raise HTTPException(status_code=500, detail=f"Resume history retrieval failed: {str(e)}")
+
 @app.post("/upsert-profile/")
 async def upsert_profile_exact_endpoint(
     request: dict,
@@ -625,12 +762,12 @@ async def upsert_profile_exact_endpoint(
             raise HTTPException(status_code=400, detail="Profile data is required and must be an object")
 
         # Save to database if configured
-        if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+        if db_manager.is_configured:
             try:
                 await db_manager.upsert_profile(current_user['id'], profile)
-                print("✅ Exact profile saved to database")
+                logging.info("Exact profile saved to database")
             except Exception as e:
-                print(f"⚠️  Failed to save exact profile to database: {e}")
+                logging.warning(f"Failed to save exact profile to database: {e}")
                 raise HTTPException(status_code=500, detail="Failed to save profile to database")
 
         return {
@@ -640,7 +777,7 @@ async def upsert_profile_exact_endpoint(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error saving exact profile: {e}")
+        logging.error(f"Error saving exact profile: {e}")
         raise HTTPException(status_code=500, detail=f"Profile save failed: {str(e)}")
 
 # LinkedIn profile creation endpoint removed - functionality not needed
@@ -650,7 +787,7 @@ shutdown_event = asyncio.Event()
 
 def signal_handler(signum, frame):
     """Handle shutdown signals"""
-    print(f"\n🛑 Received signal {signum}, initiating graceful shutdown...")
+    logging.info(f"Received signal {signum}, initiating graceful shutdown...")
     shutdown_event.set()
 
 # Register signal handlers
@@ -667,6 +804,8 @@ if __name__ == "__main__":
         port=8000,
         log_level="info",
         access_log=True,
+        # Keep the queued root handler from setup_logging() for uvicorn's own loggers
+        log_config=None,
         timeout_keep_alive=30,
         timeout_graceful_shutdown=15
     )
@@ -676,8 +815,8 @@ if __name__ == "__main__":
     try:
         server.run()
     except KeyboardInterrupt:
-        print("\n🛑 Keyboard interrupt received, shutting down...")
+        logging.info("Keyboard interrupt received, shutting down...")
     except Exception as e:
-        print(f"❌ Server error: {e}")
+        logging.error(f"Server error: {e}")
     finally:
-        print("🛑 Server stopped")
+        logging.info("Server stopped")
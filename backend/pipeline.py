@@ -0,0 +1,300 @@
+"""
+Staged resume generation pipeline.
+
+A Pipeline is an ordered list of stages run against one GenerationContext.
+Every stage run is timed (per request and in aggregate) and each stage can
+be capped to a number of concurrent requests with PIPELINE_CONCURRENCY_<STAGE>.
+PIPELINE_QUEUE_<STAGE> bounds how many requests may wait for a capped stage;
+beyond that requests are shed with 429, up front when possible and otherwise
+when they reach the full stage.
+"""
+import asyncio
+import math
+import os
+import time
+import uuid
+import threading
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from lib.agent import run_agent
+from backend_config import db_manager
+from cpu_executor import StageTiming, cpu_executor
+from metrics import (
+    pipeline_stage_duration_seconds, pipeline_stage_wait_seconds, pipeline_stage_in_flight, admission_rejected_total
+)
+from flexible_resume_processor import FlexibleResumeProcessor, ParseDeadlineExceeded
+from html_pdf_generator import html_pdf_generator
+from limits import PARSE_DEADLINE_SECONDS, parse_deadline
+from resume_model import StructuredResume
+from template_renderer import render_resume_html, TEMPLATE_PATH
+from upload_spool import upload_spool, SpoolResult
+
+# Upper bound for the Retry-After hint on shed requests
+ADMISSION_MAX_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_MAX_RETRY_AFTER_SECONDS", "60"))
+
+
+@dataclass
+class GenerationContext:
+    """State threaded through the stages of one generation request"""
+    user_id: str
+    profile: Dict[str, Any]
+    agent_profile: Any = None          # profile as handed to the agent (dict or JSON string)
+    agent_target: Optional[str] = None  # job offer URL or job description
+    metadata_label: Optional[str] = None
+    markdown: Optional[str] = None
+    resume: Optional[StructuredResume] = None
+    html: Optional[str] = None
+    pdf_bytes: Optional[bytes] = None
+    content_hash: Optional[str] = None  # object key derived from the render inputs
+    resume_id: Optional[str] = None
+    spooled: Optional[SpoolResult] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class Stage(ABC):
+    """One pipeline step; subclasses set name and implement run()"""
+    name = "stage"
+
+    @abstractmethod
+    async def run(self, ctx: GenerationContext):
+        ...
+
+
+class AgentStage(Stage):
+    name = "llm"
+
+    async def run(self, ctx: GenerationContext):
+        ctx.markdown = await run_agent(ctx.agent_profile, ctx.agent_target)
+        if not ctx.markdown:
+            raise HTTPException(status_code=500, detail="Agent failed to generate markdown")
+
+
+class ParseStage(Stage):
+    name = "parse"
+
+    async def run(self, ctx: GenerationContext):
+        ctx.resume = await parse_resume(ctx.markdown, ctx.profile)
+
+
+class ProfileOverrideStage(Stage):
+    """Contact details from the profile take priority over what the markdown says"""
+    name = "profile_override"
+
+    async def run(self, ctx: GenerationContext):
+        if isinstance(ctx.profile, dict) and ctx.profile.get('personal_info'):
+            ctx.resume.apply_personal_info(ctx.profile['personal_info'])
+
+
+class TemplateStage(Stage):
+    name = "template"
+
+    async def run(self, ctx: GenerationContext):
+        if not os.path.exists(TEMPLATE_PATH):
+            raise HTTPException(status_code=500, detail="Template file not found")
+        ctx.html = await cpu_executor.run("template", render_resume_html, ctx.resume.to_context())
+
+
+class RenderStage(Stage):
+    name = "render"
+
+    async def run(self, ctx: GenerationContext):
+        ctx.content_hash = html_pdf_generator.content_key(ctx.html)
+        ctx.pdf_bytes = await html_pdf_generator.generate_pdf_from_html(ctx.html, ctx.user_id)
+        if not ctx.pdf_bytes:
+            raise HTTPException(status_code=500, detail="PDF generation failed")
+
+
+class UploadStage(Stage):
+    name = "upload"
+
+    async def run(self, ctx: GenerationContext):
+        ctx.resume_id = str(uuid.uuid4())
+        ctx.spooled = await upload_spool.submit(ctx.pdf_bytes, ctx.user_id, ctx.resume_id, ctx.content_hash)
+        if not ctx.spooled:
+            raise HTTPException(status_code=500, detail="Failed to store PDF")
+
+
+class MetadataStage(Stage):
+    """Best-effort: a failed metadata write doesn't fail the request"""
+    name = "db"
+
+    async def run(self, ctx: GenerationContext):
+        if not db_manager.is_configured:
+            logging.warning("Database not configured - resume metadata not saved")
+            return
+        try:
+            await db_manager.save_resume_metadata(
+                ctx.user_id, ctx.resume_id, ctx.metadata_label, ctx.spooled.storage_url, ctx.spooled.content_hash
+            )
+        except Exception as e:
+            logging.warning(f"Failed to save resume metadata: {e}")
+
+
+async def parse_resume(markdown: str, profile: dict) -> StructuredResume:
+    """Parse markdown on the CPU executor, aborting once the parse deadline passes"""
+    processor_obj = FlexibleResumeProcessor()
+    try:
+        return await asyncio.wait_for(
+            cpu_executor.run("parse", processor_obj.process_resume, markdown, profile, deadline=parse_deadline()),
+            timeout=PARSE_DEADLINE_SECONDS + 1.0
+        )
+    except (ParseDeadlineExceeded, asyncio.TimeoutError):
+        logging.warning(f"Resume parsing exceeded {PARSE_DEADLINE_SECONDS}s deadline ({len(markdown)} characters)")
+        raise HTTPException(status_code=422, detail="Resume markdown is too complex to process")
+
+
+class StageLimiter:
+    """Per-stage concurrency caps, bounded wait queues and aggregate timing shared by every pipeline"""
+
+    def __init__(self):
+        self._limits: Dict[str, Optional[asyncio.Semaphore]] = {}
+        self._capacity: Dict[str, int] = {}
+        self._queue_bounds: Dict[str, Optional[int]] = {}
+        self._waiting: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+        self._timings: Dict[str, StageTiming] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, stage: str) -> Optional[asyncio.Semaphore]:
+        if stage not in self._limits:
+            limit = int(os.getenv(f"PIPELINE_CONCURRENCY_{stage.upper()}", "0"))
+            self._capacity[stage] = limit
+            self._limits[stage] = asyncio.Semaphore(limit) if limit > 0 else None
+        return self._limits[stage]
+
+    def _queue_bound(self, stage: str) -> Optional[int]:
+        """Most requests allowed to wait for a slot of this stage; None = unbounded"""
+        if stage not in self._queue_bounds:
+            bound = os.getenv(f"PIPELINE_QUEUE_{stage.upper()}")
+            self._queue_bounds[stage] = int(bound) if bound not in (None, "") else None
+        return self._queue_bounds[stage]
+
+    def _saturated(self, stage: str) -> bool:
+        """Whether a new request would have to wait for the stage and its queue is already full"""
+        semaphore = self._semaphore(stage)
+        bound = self._queue_bound(stage)
+        if semaphore is None or bound is None:
+            return False
+        return semaphore.locked() and self._waiting.get(stage, 0) >= bound
+
+    def _shed(self, stage: str, source: str):
+        admission_rejected_total.inc(pipeline=source, stage=stage)
+        with self._lock:
+            self._rejected[stage] = self._rejected.get(stage, 0) + 1
+        logging.warning(f"Admission: shed {source} request, stage {stage} saturated")
+        raise HTTPException(
+            status_code=429,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(self.retry_after(stage))}
+        )
+
+    def admit(self, stages: List[str], source: str):
+        """Shed the request with 429 before any work starts if a stage it needs is saturated"""
+        for stage in stages:
+            if self._saturated(stage):
+                self._shed(stage, source)
+
+    def retry_after(self, stage: str) -> int:
+        """Seconds until a queued request would likely get a slot, from the stage's average run time"""
+        self._semaphore(stage)
+        limit = max(self._capacity[stage], 1)
+        with self._lock:
+            timing = self._timings.get(stage)
+            avg_run = timing.total_run / timing.count if timing and timing.count else 1.0
+        estimate = avg_run * (self._waiting.get(stage, 0) + 1) / limit
+        return max(1, min(ADMISSION_MAX_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+    @asynccontextmanager
+    async def slot(self, stage: str, source: str = "pipeline"):
+        """Hold one concurrency slot of a stage, waiting in its queue if needed.
+
+        admit() only sees the queues as they are when a request starts; requests
+        admitted together reach later stages together, so a full queue sheds
+        them here as well.
+        """
+        semaphore = self._semaphore(stage)
+        if self._saturated(stage):
+            self._shed(stage, source)
+        if semaphore is not None:
+            self._waiting[stage] = self._waiting.get(stage, 0) + 1
+            try:
+                await semaphore.acquire()
+            finally:
+                self._waiting[stage] -= 1
+        pipeline_stage_in_flight.inc(stage=stage)
+        try:
+            yield
+        finally:
+            pipeline_stage_in_flight.dec(stage=stage)
+            if semaphore is not None:
+                semaphore.release()
+
+    async def run(self, stage: Stage, ctx: GenerationContext, source: str = "pipeline"):
+        """Run one stage under its concurrency cap, recording queue wait and run time"""
+        submitted = time.perf_counter()
+        async with self.slot(stage.name, source):
+            started = time.perf_counter()
+            try:
+                await stage.run(ctx)
+            except asyncio.CancelledError:
+                self._record(stage.name, started - submitted, time.perf_counter() - started, outcome="cancelled")
+                raise
+            except BaseException:
+                self._record(stage.name, started - submitted, time.perf_counter() - started, outcome="error")
+                raise
+        elapsed = time.perf_counter() - started
+        ctx.timings[stage.name] = elapsed
+        self._record(stage.name, started - submitted, elapsed)
+
+    def _record(self, stage: str, wait: float, run: float, outcome: str = "ok"):
+        pipeline_stage_wait_seconds.observe(wait, stage=stage)
+        pipeline_stage_duration_seconds.observe(run, stage=stage, outcome=outcome)
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                timing = self._timings[stage] = StageTiming()
+            timing.count += 1
+            if outcome != "ok":
+                timing.errors += 1
+            timing.total_wait += wait
+            timing.total_run += run
+            timing.max_run = max(timing.max_run, run)
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate timing, current queue length and shed requests per stage"""
+        with self._lock:
+            names = set(self._timings) | set(self._rejected)
+            return {
+                name: dict(
+                    self._timings[name].to_dict() if name in self._timings else StageTiming().to_dict(),
+                    waiting=self._waiting.get(name, 0),
+                    rejected=self._rejected.get(name, 0)
+                )
+                for name in sorted(names)
+            }
+
+
+class Pipeline:
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = stages
+
+    async def run(self, ctx: GenerationContext) -> GenerationContext:
+        stage_limiter.admit([stage.name for stage in self.stages], self.name)
+        started = time.perf_counter()
+        try:
+            for stage in self.stages:
+                await stage_limiter.run(stage, ctx, self.name)
+        finally:
+            total = time.perf_counter() - started
+            breakdown = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in ctx.timings.items())
+            logging.info(f"Pipeline {self.name} for user {ctx.user_id}: {total * 1000:.0f}ms ({breakdown})")
+        return ctx
+
+
+# Global instance
+stage_limiter = StageLimiter()
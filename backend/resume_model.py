@@ -0,0 +1,207 @@
+"""
+Typed structured resume model produced by the flexible resume processor
+"""
+import json
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Any, Union
+
+
+@dataclass(slots=True)
+class ExperienceEntry:
+    """A single job in the Professional Experience section"""
+    title: str = ''
+    company: str = ''
+    start_date: str = ''
+    end_date: str = ''
+    bullets: List[str] = field(default_factory=list)
+    impact: List[str] = field(default_factory=list)
+
+    def to_context(self) -> Dict[str, Any]:
+        return {
+            'title': self.title,
+            'company': self.company,
+            'startDate': self.start_date,
+            'endDate': self.end_date,
+            'bullets': self.bullets,
+            'impact': self.impact
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ExperienceEntry':
+        _check_keys(cls.__name__, data, {'title', 'company', 'startDate', 'endDate', 'bullets', 'impact'})
+        return cls(
+            title=_str(data, 'title'),
+            company=_str(data, 'company'),
+            start_date=_str(data, 'startDate'),
+            end_date=_str(data, 'endDate'),
+            bullets=_str_list(data, 'bullets'),
+            impact=_str_list(data, 'impact')
+        )
+
+
+@dataclass(slots=True)
+class EducationEntry:
+    """A single degree in the Education section"""
+    name: str = ''
+    dates: str = ''
+
+    def to_context(self) -> Dict[str, Any]:
+        return {'name': self.name, 'dates': self.dates}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EducationEntry':
+        _check_keys(cls.__name__, data, {'name', 'dates'})
+        return cls(name=_str(data, 'name'), dates=_str(data, 'dates'))
+
+
+@dataclass(slots=True)
+class ProjectEntry:
+    """A single row of the Selected Projects section"""
+    name: str = ''
+    stack: str = ''
+    desc: List[str] = field(default_factory=list)
+
+    def to_context(self) -> Dict[str, Any]:
+        return {'name': self.name, 'stack': self.stack, 'desc': self.desc}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProjectEntry':
+        _check_keys(cls.__name__, data, {'name', 'stack', 'desc'})
+        return cls(name=_str(data, 'name'), stack=_str(data, 'stack'), desc=_str_list(data, 'desc'))
+
+
+@dataclass(slots=True)
+class StructuredResume:
+    """Structured resume data, convertible to the Handlebars template context"""
+    name: str = ''
+    title: str = ''
+    email: str = ''
+    phone: str = ''
+    location: str = ''
+    linkedin: str = ''
+    github: str = ''
+    summary: str = ''
+    experience: List[ExperienceEntry] = field(default_factory=list)
+    education: List[EducationEntry] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    core_skills: Dict[str, List[str]] = field(default_factory=dict)
+    interests: List[str] = field(default_factory=list)
+    certifications: List[str] = field(default_factory=list)
+    projects: List[ProjectEntry] = field(default_factory=list)
+    achievements: List[str] = field(default_factory=list)
+    strengths: List[str] = field(default_factory=list)
+    additional: str = ''
+    fit: Union[List[str], str] = ''
+    current_year: str = '2025'
+
+    def apply_personal_info(self, personal_info: Dict[str, Any]):
+        """Let contact info from the user's profile take priority over markdown extraction"""
+        self.name = personal_info.get('full_name', self.name)
+        self.title = personal_info.get('title', '') or personal_info.get('job_title', '') or self.title
+        self.email = personal_info.get('email', self.email)
+        self.phone = personal_info.get('phone', self.phone)
+        self.location = personal_info.get('location', self.location)
+        self.linkedin = personal_info.get('linkedin_url', '') or personal_info.get('linkedin', '') or self.linkedin
+        self.github = personal_info.get('github_url', '') or personal_info.get('github', '') or self.github
+
+    def to_context(self) -> Dict[str, Any]:
+        """Build the template context (same shape as the legacy processor dict)"""
+        return {
+            'name': self.name,
+            'title': self.title,
+            'email': self.email,
+            'phone': self.phone,
+            'location': self.location,
+            'linkedin': self.linkedin,
+            'github': self.github,
+            'summary': self.summary,
+            'experience': [entry.to_context() for entry in self.experience],
+            'education': [entry.to_context() for entry in self.education],
+            'languages': self.languages,
+            'tags': self.tags,
+            'core_skills': self.core_skills,
+            'interests': self.interests,
+            'certifications': self.certifications,
+            'projects': [entry.to_context() for entry in self.projects],
+            'achievements': self.achievements,
+            'strengths': self.strengths,
+            'additional': self.additional,
+            'fit': self.fit,
+            'currentYear': self.current_year
+        }
+
+    def to_json(self) -> str:
+        """Serialize to compact JSON"""
+        return json.dumps(self.to_context(), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StructuredResume':
+        """Build from a template-context dict, raising ValueError on schema drift"""
+        _check_keys(cls.__name__, data, _CONTEXT_KEYS)
+        core_skills = data.get('core_skills', {})
+        if not isinstance(core_skills, dict):
+            raise ValueError("StructuredResume.core_skills must be an object")
+        fit = data.get('fit', '')
+        return cls(
+            name=_str(data, 'name'),
+            title=_str(data, 'title'),
+            email=_str(data, 'email'),
+            phone=_str(data, 'phone'),
+            location=_str(data, 'location'),
+            linkedin=_str(data, 'linkedin'),
+            github=_str(data, 'github'),
+            summary=_str(data, 'summary'),
+            experience=[ExperienceEntry.from_dict(item) for item in data.get('experience', [])],
+            education=[EducationEntry.from_dict(item) for item in data.get('education', [])],
+            languages=_str_list(data, 'languages'),
+            tags=_str_list(data, 'tags'),
+            core_skills={str(key): _str_list(core_skills, key) for key in core_skills},
+            interests=_str_list(data, 'interests'),
+            certifications=_str_list(data, 'certifications'),
+            projects=[ProjectEntry.from_dict(item) for item in data.get('projects', [])],
+            achievements=_str_list(data, 'achievements'),
+            strengths=_str_list(data, 'strengths'),
+            additional=_str(data, 'additional'),
+            fit=fit if isinstance(fit, str) else _str_list(data, 'fit'),
+            current_year=_str(data, 'currentYear') or '2025'
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> 'StructuredResume':
+        return cls.from_dict(json.loads(payload))
+
+
+# Context keys are the dataclass fields, except current_year which the template calls currentYear
+_CONTEXT_KEYS = {f.name for f in fields(StructuredResume)} - {'current_year'} | {'currentYear'}
+
+
+def to_context_value(value: Any) -> Any:
+    """Convert a model value (entry, list of entries or plain value) to its context form"""
+    if isinstance(value, list):
+        return [to_context_value(item) for item in value]
+    if hasattr(value, 'to_context'):
+        return value.to_context()
+    return value
+
+
+def _check_keys(model: str, data: Any, allowed: set):
+    if not isinstance(data, dict):
+        raise ValueError(f"{model} must be an object, got {type(data).__name__}")
+    unknown = set(data) - allowed
+    if unknown:
+        raise ValueError(f"{model} has unknown fields: {', '.join(sorted(unknown))}")
+
+
+def _str(data: Dict[str, Any], key: str) -> str:
+    value = data.get(key, '')
+    if not isinstance(value, str):
+        raise ValueError(f"Field '{key}' must be a string, got {type(value).__name__}")
+    return value
+
+
+def _str_list(data: Dict[str, Any], key: str) -> List[str]:
+    value = data.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"Field '{key}' must be a list of strings")
+    return value
@@ -11,10 +11,14 @@ CREATE TABLE IF NOT EXISTS profiles (
     user_id TEXT NOT NULL,
     profile JSONB NOT NULL,
     role_family TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- For databases created before optimistic profile versioning
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
 -- Create unique index on user_id
 CREATE UNIQUE INDEX IF NOT EXISTS idx_profiles_user_id ON profiles(user_id);
 
@@ -26,11 +30,78 @@ CREATE TABLE IF NOT EXISTS resume_metadata (
     job_url TEXT,
     status TEXT DEFAULT 'generated',
     storage_url TEXT,
+    content_hash TEXT,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Create index on user_id for resume_metadata
-CREATE INDEX IF NOT EXISTS idx_resume_metadata_user_id ON resume_metadata(user_id);
+-- For databases created before content-addressed storage
+ALTER TABLE resume_metadata ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- Composite index for per-user history with keyset pagination on (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_resume_metadata_user_created
+    ON resume_metadata(user_id, created_at DESC, id DESC);
+
+-- Superseded by idx_resume_metadata_user_created (same leading column)
+DROP INDEX IF EXISTS idx_resume_metadata_user_id;
+
+-- Lookup of PDFs (user_id/<content_hash>.pdf) still referenced, for storage garbage collection
+CREATE INDEX IF NOT EXISTS idx_resume_metadata_user_hash
+    ON resume_metadata(user_id, content_hash);
+
+-- Every profile write bumps its version (used for If-Match conflict detection)
+CREATE OR REPLACE FUNCTION bump_profile_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_profiles_version ON profiles;
+CREATE TRIGGER trg_profiles_version
+    BEFORE UPDATE ON profiles
+    FOR EACH ROW EXECUTE FUNCTION bump_profile_version();
+
+-- RFC 7396 JSON merge patch: objects merge recursively, null deletes a key,
+-- anything else replaces the target value
+CREATE OR REPLACE FUNCTION jsonb_merge_patch(target JSONB, patch JSONB) RETURNS JSONB
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    result JSONB;
+    patch_key TEXT;
+    patch_value JSONB;
+BEGIN
+    IF jsonb_typeof(patch) IS DISTINCT FROM 'object' THEN
+        RETURN patch;
+    END IF;
+    IF jsonb_typeof(target) IS DISTINCT FROM 'object' THEN
+        result := '{}'::JSONB;
+    ELSE
+        result := target;
+    END IF;
+    FOR patch_key, patch_value IN SELECT * FROM jsonb_each(patch) LOOP
+        IF jsonb_typeof(patch_value) = 'null' THEN
+            result := result - patch_key;
+        ELSE
+            result := jsonb_set(result, ARRAY[patch_key], jsonb_merge_patch(result -> patch_key, patch_value));
+        END IF;
+    END LOOP;
+    RETURN result;
+END;
+$$;
+
+-- Apply a merge patch to a profile in place; returns no row when the profile
+-- is missing or its version no longer matches p_expected_version
+CREATE OR REPLACE FUNCTION patch_profile(p_user_id TEXT, p_patch JSONB, p_expected_version INTEGER DEFAULT NULL)
+RETURNS SETOF profiles
+LANGUAGE sql AS $$
+    UPDATE profiles
+    SET profile = jsonb_merge_patch(profile, p_patch)
+    WHERE user_id = p_user_id
+      AND (p_expected_version IS NULL OR version = p_expected_version)
+    RETURNING *;
+$$;
 
 -- =============================================
 -- 2. ENABLE ROW LEVEL SECURITY (RLS)
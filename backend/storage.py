@@ -1,83 +1,182 @@
 import os
-import uuid
-from supabase import create_client, Client
-from typing import Optional
+import time
+import asyncio
+import httpx
+from email.utils import parsedate_to_datetime
+from typing import Optional, List
 import logging
 from dotenv import load_dotenv
+from ttl_cache import TTLCache
+from backends import StorageBackend, STORAGE_GC_GRACE_SECONDS
 
 # Load environment variables
 load_dotenv()
 
-class SupabaseStorageManager:
+# How long a known object's write time is trusted before asking storage again;
+# kept short because storage GC may delete objects behind this process's back
+KNOWN_OBJECT_TTL_SECONDS = float(os.getenv("STORAGE_KNOWN_OBJECT_TTL_SECONDS", "5"))
+
+class SupabaseStorageManager(StorageBackend):
+    """Supabase Storage client using a persistent, pooled async HTTP connection"""
+
     def __init__(self):
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
         self.bucket_name = os.getenv("SUPABASE_STORAGE_BUCKET", "resumes")
-        self.client: Optional[Client] = None
-        
+        self.max_concurrent_uploads = int(os.getenv("STORAGE_MAX_CONCURRENT_UPLOADS", "8"))
+        self.connect_timeout = float(os.getenv("STORAGE_CONNECT_TIMEOUT", "5"))
+        self.request_timeout = float(os.getenv("STORAGE_REQUEST_TIMEOUT", "30"))
+        self.client: Optional[httpx.AsyncClient] = None
+        self._upload_slots: Optional[asyncio.Semaphore] = None
+        # Write time (epoch seconds) of objects seen in the last few seconds, so bursts skip the HEAD
+        self._known_objects = TTLCache(10000, KNOWN_OBJECT_TTL_SECONDS, name="storage_objects")
+
         if self.supabase_url and self.supabase_service_key:
-            self.client = create_client(self.supabase_url, self.supabase_service_key)
-            logging.info("Supabase Storage client initialized")
+            logging.info("Supabase Storage client configured")
         else:
             logging.warning("Supabase Storage not configured - missing environment variables")
 
-    async def upload_pdf(self, pdf_bytes: bytes, user_id: str, resume_id: str) -> Optional[str]:
-        """Upload PDF to Supabase Storage and return the public URL"""
-        if not self.client:
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.supabase_url and self.supabase_service_key)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared HTTP client on first use"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=f"{self.supabase_url}/storage/v1",
+                headers={
+                    "Authorization": f"Bearer {self.supabase_service_key}",
+                    "apikey": self.supabase_service_key
+                },
+                timeout=httpx.Timeout(self.request_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrent_uploads * 2,
+                    max_keepalive_connections=self.max_concurrent_uploads
+                )
+            )
+            self._upload_slots = asyncio.Semaphore(self.max_concurrent_uploads)
+            logging.info("Supabase Storage HTTP client initialized")
+        return self.client
+
+    def get_public_url(self, file_path: str) -> str:
+        """Public URL of an object in the bucket"""
+        return f"{self.supabase_url}/storage/v1/object/public/{self.bucket_name}/{file_path}"
+
+    async def object_age(self, file_path: str) -> Optional[float]:
+        """Seconds since the object was last written, from its Last-Modified header"""
+        if not self.is_configured:
+            return None
+        modified = self._known_objects.get(file_path)
+        if modified is None:
+            try:
+                response = await self._get_client().head(f"/object/authenticated/{self.bucket_name}/{file_path}")
+            except Exception as e:
+                logging.warning(f"Error checking storage object {file_path}: {str(e)}")
+                return None
+            if response.status_code != 200:
+                return None
+            try:
+                modified = parsedate_to_datetime(response.headers["last-modified"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                return None
+            self._known_objects.set(file_path, modified)
+        return max(0.0, time.time() - modified)
+
+    async def upload_pdf(self, pdf_bytes: bytes, user_id: str, object_name: str) -> Optional[str]:
+        """Upload PDF to Supabase Storage and return the public URL.
+
+        object_name is normally the content hash; an upload of an object this
+        process wrote or saw in the last few seconds is skipped.
+        """
+        if not self.is_configured:
             logging.error("Supabase Storage client not initialized")
             return None
-        
+
         try:
-            # Create file path: user_id/resume_id.pdf
-            file_path = f"{user_id}/{resume_id}.pdf"
-            
+            client = self._get_client()
+            file_path = self.get_object_path(user_id, object_name)
+
+            # Callers check object_reusable() first; only skip objects that were just written
+            modified = self._known_objects.get(file_path)
+            if modified is not None and time.time() - modified < STORAGE_GC_GRACE_SECONDS / 2:
+                logging.info(f"PDF already stored, skipping upload: {file_path}")
+                return self.get_public_url(file_path)
+
             # Upload file to storage
-            result = self.client.storage.from_(self.bucket_name).upload(
-                path=file_path,
-                file=pdf_bytes,
-                file_options={"content-type": "application/pdf"}
-            )
-            
-            if result:
-                # Get public URL
-                public_url = self.client.storage.from_(self.bucket_name).get_public_url(file_path)
+            async with self._upload_slots:
+                response = await client.post(
+                    f"/object/{self.bucket_name}/{file_path}",
+                    content=pdf_bytes,
+                    headers={"Content-Type": "application/pdf", "x-upsert": "true"}
+                )
+
+            if response.status_code == 200:
+                self._known_objects.set(file_path, time.time())
+                public_url = self.get_public_url(file_path)
                 logging.info(f"PDF uploaded successfully: {public_url}")
                 return public_url
             else:
-                logging.error("Failed to upload PDF to storage")
+                logging.error(f"Failed to upload PDF to storage (status {response.status_code}): {response.text}")
                 return None
-                
+
         except Exception as e:
             logging.error(f"Error uploading PDF to storage: {str(e)}")
             return None
 
-    async def delete_pdf(self, user_id: str, resume_id: str) -> bool:
-        """Delete PDF from Supabase Storage"""
-        if not self.client:
+    async def delete_pdfs(self, user_id: str, object_names: List[str]) -> bool:
+        """Delete several of a user's PDFs in one request"""
+        if not self.is_configured:
             logging.error("Supabase Storage client not initialized")
             return False
-        
+        if not object_names:
+            return True
+
         try:
-            file_path = f"{user_id}/{resume_id}.pdf"
-            result = self.client.storage.from_(self.bucket_name).remove([file_path])
-            logging.info(f"PDF deleted successfully: {file_path}")
+            file_paths = [self.get_object_path(user_id, name) for name in object_names]
+            response = await self._get_client().request(
+                "DELETE",
+                f"/object/{self.bucket_name}",
+                json={"prefixes": file_paths}
+            )
+            if response.status_code != 200:
+                logging.error(f"Failed to delete PDF from storage (status {response.status_code}): {response.text}")
+                return False
+            for file_path in file_paths:
+                self._known_objects.pop(file_path)
+            logging.info(f"Deleted {len(file_paths)} PDF(s) from storage for user {user_id}")
             return True
         except Exception as e:
             logging.error(f"Error deleting PDF from storage: {str(e)}")
             return False
 
-    async def list_user_pdfs(self, user_id: str) -> list:
-        """List all PDFs for a user"""
-        if not self.client:
+    async def list_user_pdfs(self, user_id: str, limit: int = 100, offset: int = 0) -> list:
+        """List one page of a user's PDFs"""
+        if not self.is_configured:
             logging.error("Supabase Storage client not initialized")
             return []
-        
+
         try:
-            result = self.client.storage.from_(self.bucket_name).list(path=user_id)
-            return result or []
+            response = await self._get_client().post(
+                f"/object/list/{self.bucket_name}",
+                json={
+                    "prefix": user_id,
+                    "limit": limit,
+                    "offset": offset,
+                    "sortBy": {"column": "name", "order": "asc"}
+                }
+            )
+            if response.status_code != 200:
+                logging.error(f"Failed to list user PDFs (status {response.status_code}): {response.text}")
+                return []
+            return response.json() or []
         except Exception as e:
             logging.error(f"Error listing user PDFs: {str(e)}")
             return []
 
-# Global storage manager instance
-storage_manager = SupabaseStorageManager()
+    async def close(self):
+        """Close the pooled HTTP client"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            logging.info("Supabase Storage HTTP client closed")
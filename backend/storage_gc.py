@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Garbage collection of stored PDFs that no resume_metadata row references.
+
+Usage (from the backend directory):
+    python storage_gc.py                 # all users
+    python storage_gc.py --user USER_ID  # a single user
+"""
+import argparse
+import asyncio
+import logging
+from typing import Optional
+from dotenv import load_dotenv
+load_dotenv()
+
+from logging_setup import setup_logging, stop_logging
+
+from backend_config import db_manager, storage_manager
+from backends import STORAGE_GC_GRACE_SECONDS
+
+
+async def collect_garbage(user_id: Optional[str] = None) -> int:
+    """Delete unreferenced content-addressed PDFs; returns the number deleted"""
+    user_ids = [user_id] if user_id else await db_manager.list_user_ids()
+    deleted = 0
+    for uid in user_ids:
+        removed = await storage_manager.collect_garbage(
+            uid, lambda: db_manager.get_referenced_content_hashes(uid), STORAGE_GC_GRACE_SECONDS
+        )
+        if removed:
+            logging.info(f"Storage GC: removed {removed} unreferenced PDF(s) for user {uid}")
+        deleted += removed
+    return deleted
+
+
+async def main(user_id: Optional[str]):
+    try:
+        deleted = await collect_garbage(user_id)
+        logging.info(f"Storage GC complete: {deleted} unreferenced PDF(s) deleted")
+    finally:
+        await storage_manager.close()
+        await db_manager.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete stored PDFs no resume references")
+    parser.add_argument("--user", help="only collect this user's PDFs")
+    args = parser.parse_args()
+    setup_logging()
+    try:
+        asyncio.run(main(args.user))
+    finally:
+        stop_logging()
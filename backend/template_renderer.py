@@ -0,0 +1,36 @@
+"""
+Handlebars rendering of the resume HTML template with a cached compiled template
+"""
+import os
+import threading
+from typing import Any, Dict
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resume_template.html")
+
+_lock = threading.Lock()
+_compiled = None
+_compiled_mtime = None
+
+
+def get_compiled_template():
+    """Compile the resume template once per process, recompiling if the file changes"""
+    global _compiled, _compiled_mtime
+
+    mtime = os.path.getmtime(TEMPLATE_PATH)
+    if _compiled is not None and _compiled_mtime == mtime:
+        return _compiled
+
+    with _lock:
+        if _compiled is None or _compiled_mtime != mtime:
+            from pybars import Compiler
+            with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+                template_content = f.read()
+            _compiled = Compiler().compile(template_content)
+            _compiled_mtime = mtime
+    return _compiled
+
+
+def render_resume_html(context: Dict[str, Any]) -> str:
+    """Render the resume template with a structured resume context"""
+    template = get_compiled_template()
+    return str(template(context))
@@ -0,0 +1,29 @@
+"""
+Shared test setup: run against the local filesystem / SQLite backends in a
+temporary directory so no Supabase, OpenRouter or browser is needed.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_workdir = tempfile.mkdtemp(prefix="cv-tests-")
+# Must be set before any backend module is imported
+os.environ.update({
+    "STORAGE_BACKEND": "local",
+    "DATABASE_BACKEND": "sqlite",
+    "LOCAL_STORAGE_DIR": os.path.join(_workdir, "storage"),
+    "SQLITE_DATABASE_PATH": os.path.join(_workdir, "local.db"),
+    "UPLOAD_SPOOL_DIR": os.path.join(_workdir, "spool"),
+    "JOB_QUEUE_PATH": os.path.join(_workdir, "jobs.db"),
+    "IDEMPOTENCY_DB_PATH": os.path.join(_workdir, "idempotency.db"),
+})
+
+CORPUS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "corpus")
+
+
+def corpus_markdown(name: str) -> str:
+    with open(os.path.join(CORPUS_DIR, f"{name}.md"), "r", encoding="utf-8") as f:
+        return f.read()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from pipeline import StageLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setenv("PIPELINE_CONCURRENCY_LLM", "1")
+    monkeypatch.setenv("PIPELINE_QUEUE_LLM", "1")
+    monkeypatch.setenv("PIPELINE_CONCURRENCY_RENDER", "1")
+    monkeypatch.setenv("PIPELINE_QUEUE_RENDER", "1")
+    return StageLimiter()
+
+
+def test_requests_are_admitted_while_the_queue_has_room(limiter):
+    async def scenario():
+        async with limiter.slot("llm"):
+            limiter.admit(["llm", "parse"], "resume_agent")
+
+    asyncio.run(scenario())
+
+
+def test_request_is_shed_with_429_when_queue_is_full(limiter):
+    async def scenario():
+        async with limiter.slot("llm"):
+            waiter = asyncio.create_task(limiter.slot("llm").__aenter__())
+            await asyncio.sleep(0)
+            try:
+                with pytest.raises(HTTPException) as error:
+                    limiter.admit(["llm"], "resume_agent")
+            finally:
+                waiter.cancel()
+                await asyncio.gather(waiter, return_exceptions=True)
+            return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+    assert limiter.stats()["llm"]["rejected"] == 1
+    assert limiter.stats()["llm"]["waiting"] == 0
+
+
+def test_uncapped_stages_are_never_shed(limiter):
+    async def scenario():
+        async with limiter.slot("parse"), limiter.slot("parse"):
+            limiter.admit(["parse"], "markdown_pdf")
+
+    asyncio.run(scenario())
+
+
+def test_requests_admitted_together_never_overfill_a_later_queue(limiter):
+    peak_waiting = 0
+    outcomes = []
+
+    async def request():
+        try:
+            # Every request passes admission while the render queue is still empty
+            limiter.admit(["parse", "render"], "markdown_pdf")
+            await asyncio.sleep(0.01)
+            async with limiter.slot("render", "markdown_pdf"):
+                await asyncio.sleep(0.02)
+            outcomes.append("ok")
+        except HTTPException as e:
+            outcomes.append(e.status_code)
+
+    async def watch():
+        nonlocal peak_waiting
+        while True:
+            peak_waiting = max(peak_waiting, limiter._waiting.get("render", 0))
+            await asyncio.sleep(0)
+
+    async def scenario():
+        watcher = asyncio.create_task(watch())
+        await asyncio.gather(*(request() for _ in range(10)))
+        watcher.cancel()
+
+    asyncio.run(scenario())
+    assert peak_waiting <= 1
+    assert outcomes.count("ok") == 2
+    assert outcomes.count(429) == 8
+    assert limiter.stats()["render"]["rejected"] == 8
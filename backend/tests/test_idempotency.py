@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import idempotency
+from idempotency import IdempotencyStore, request_fingerprint, run_idempotent
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("IDEMPOTENCY_DB_PATH", str(tmp_path / "idempotency.db"))
+    monkeypatch.setenv("IDEMPOTENCY_WAIT_SECONDS", "0.3")
+    monkeypatch.setenv("IDEMPOTENCY_POLL_INTERVAL_SECONDS", "0.01")
+    store = IdempotencyStore()
+    monkeypatch.setattr(idempotency, "idempotency_store", store)
+    yield store
+    store.close()
+
+
+def counting_handler(calls, result=None, delay=0.0, error=None):
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result or {"resume_id": f"r{len(calls)}"}
+    return handler
+
+
+def run(key, payload, handler):
+    return run_idempotent(key, "u1", "generate", payload, handler)
+
+
+def test_retry_replays_stored_response(store):
+    calls = []
+
+    async def scenario():
+        first = await run("k1", {"a": 1}, counting_handler(calls))
+        second = await run("k1", {"a": 1}, counting_handler(calls))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert json.loads(second.body) == json.loads(first.body) == {"resume_id": "r1"}
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+def test_key_reused_with_different_request_is_rejected(store):
+    async def scenario():
+        await run("k1", {"a": 1}, counting_handler([]))
+        await run("k1", {"a": 2}, counting_handler([]))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 422
+
+
+def test_failed_request_releases_key(store):
+    calls = []
+
+    async def scenario():
+        with pytest.raises(HTTPException):
+            await run("k1", {"a": 1}, counting_handler(calls, error=HTTPException(status_code=502)))
+        return await run("k1", {"a": 1}, counting_handler(calls))
+
+    assert json.loads(asyncio.run(scenario()).body) == {"resume_id": "r2"}
+    assert len(calls) == 2
+
+
+def test_concurrent_retry_waits_for_first_request(store):
+    calls = []
+
+    async def scenario():
+        first = asyncio.create_task(run("k1", {"a": 1}, counting_handler(calls, delay=0.1)))
+        await asyncio.sleep(0.02)
+        second = await run("k1", {"a": 1}, counting_handler(calls))
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert json.loads(second.body) == json.loads(first.body)
+
+
+def test_request_still_in_progress_gets_409(store):
+    store._claim("u1", "generate", "k1", request_fingerprint({"a": 1}))
+    calls = []
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run("k1", {"a": 1}, counting_handler(calls)))
+    assert error.value.status_code == 409
+    assert calls == []
+
+
+def test_handler_never_runs_without_a_claim(store, monkeypatch):
+    fingerprint = request_fingerprint({"a": 1})
+    store._claim("u1", "generate", "k1", fingerprint)
+    original_wait = store.wait
+    waits = []
+
+    async def racing_wait(user_id, endpoint, key, timeout=None):
+        # The holder fails and releases, but another retry claims the key before we do, every time
+        waits.append(1)
+        await store.release(user_id, endpoint, key)
+        store._claim(user_id, endpoint, key, fingerprint)
+        if len(waits) < 3:
+            return None
+        return await original_wait(user_id, endpoint, key, timeout)
+
+    monkeypatch.setattr(store, "wait", racing_wait)
+    calls = []
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run("k1", {"a": 1}, counting_handler(calls)))
+    assert error.value.status_code == 409
+    assert calls == []
+    assert len(waits) == 3
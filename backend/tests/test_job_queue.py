@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_QUEUE_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("JOB_MAX_ATTEMPTS", "2")
+    monkeypatch.setenv("JOB_RETRY_DELAY_SECONDS", "0")
+    queue = JobQueue()
+    yield queue
+    queue.close()
+
+
+def expire_lease(queue, job_id):
+    queue._execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+
+
+def test_claim_complete(queue):
+    async def scenario():
+        job = await queue.enqueue("generate", "u1", {"job_url": "https://jobs.test/1"})
+        claimed = await queue.claim("w1")
+        assert claimed["id"] == job["id"] and claimed["attempts"] == 1
+        assert await queue.claim("w2") is None
+        await queue.complete(job["id"], "w1", {"resume_id": "r1"})
+        return await queue.wait(job["id"], "u1", timeout=1)
+
+    finished = asyncio.run(scenario())
+    assert JobQueue.to_response(finished)["result"] == {"resume_id": "r1"}
+    assert finished["status"] == "succeeded"
+
+
+def test_retryable_failure_requeues_until_max_attempts(queue):
+    async def scenario():
+        job = await queue.enqueue("generate", "u1", {})
+        await queue.claim("w1")
+        await queue.fail(job["id"], "w1", "upstream 502")
+        assert (await queue.get(job["id"], "u1"))["status"] == "queued"
+        await queue.claim("w1")
+        await queue.fail(job["id"], "w1", "upstream 502")
+        return await queue.get(job["id"], "u1")
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed" and job["attempts"] == 2
+
+
+def test_non_retryable_failure_fails_immediately(queue):
+    async def scenario():
+        job = await queue.enqueue("generate", "u1", {})
+        await queue.claim("w1")
+        await queue.fail(job["id"], "w1", "bad markdown", retry=False)
+        return await queue.get(job["id"], "u1")
+
+    assert asyncio.run(scenario())["status"] == "failed"
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue):
+    async def scenario():
+        job = await queue.enqueue("generate", "u1", {})
+        await queue.claim("w1")
+        expire_lease(queue, job["id"])
+        reclaimed = await queue.claim("w2")
+        still_leased = await queue.extend_lease(job["id"], "w1")
+        return reclaimed, still_leased
+
+    reclaimed, still_leased = asyncio.run(scenario())
+    assert reclaimed["worker_id"] == "w2" and reclaimed["attempts"] == 2
+    assert not still_leased
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue):
+    async def scenario():
+        job = await queue.enqueue("generate", "u1", {})
+        for worker_id in ("w1", "w2"):
+            assert await queue.claim(worker_id) is not None
+            expire_lease(queue, job["id"])
+        assert await queue.claim("w3") is None
+        return await queue.get(job["id"], "u1")
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert "lease expired" in job["error"]
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_current_user
+from cpu_executor import CPUExecutor
+from limits import MAX_REQUEST_BYTES
+
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[get_current_user] = lambda: {"id": "limits-user"}
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def test_declared_oversized_body_is_rejected(client):
+    response = client.patch("/profile", content=b"{}", headers={"Content-Length": str(MAX_REQUEST_BYTES + 1)})
+    assert response.status_code == 413
+
+
+def test_chunked_oversized_body_is_rejected(client):
+    def chunks():
+        # No Content-Length: httpx sends a generator with chunked transfer encoding
+        for _ in range(MAX_REQUEST_BYTES // 65536 + 2):
+            yield b" " * 65536
+
+    response = client.post("/generate-resume-agent/stream", content=chunks(), headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_timed_out_task_stays_pending_until_its_thread_finishes():
+    executor = CPUExecutor()
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run("parse", release.wait), timeout=0.05)
+        still_running = executor.stats()["pending"]
+        release.set()
+        for _ in range(100):
+            if executor.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return still_running, executor.stats()["pending"]
+
+    try:
+        assert asyncio.run(scenario()) == (1, 0)
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_current_user
+from conftest import corpus_markdown
+
+PROFILE = {"personal_info": {"full_name": "Marta Kowalska"}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    renders = []
+    original_render = main.render_html_preview
+
+    async def counting_render(*args):
+        renders.append(args)
+        return await original_render(*args)
+
+    monkeypatch.setattr(main, "render_html_preview", counting_render)
+    main.app.dependency_overrides[get_current_user] = lambda: {"id": "preview-user"}
+    yield TestClient(main.app), renders
+    main.app.dependency_overrides.clear()
+
+
+def test_revalidation_returns_304_without_rendering(client):
+    http, renders = client
+    body = {"markdown": corpus_markdown("data_engineer_standard"), "profile": PROFILE}
+
+    first = http.post("/preview-html/", json=body)
+    assert first.status_code == 200 and "Marta Kowalska" in first.text
+    assert len(renders) == 1
+
+    again = http.post("/preview-html/", json=body, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert len(renders) == 1
+
+
+def test_changed_markdown_is_rendered(client):
+    http, renders = client
+    body = {"markdown": corpus_markdown("data_engineer_standard"), "profile": PROFILE}
+    etag = http.post("/preview-html/", json=body).headers["ETag"]
+
+    body["markdown"] += "\n### Interests\nChess"
+    response = http.post("/preview-html/", json=body, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(renders) == 2
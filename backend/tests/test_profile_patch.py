@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_current_user
+from backends import profile_etag
+from database_sqlite import SQLiteDatabaseManager
+
+PROFILE = {"personal_info": {"full_name": "Marta Kowalska", "phone": "+48 600 000 000"}, "skills": ["SQL"]}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", str(tmp_path / "profiles.db"))
+    db = SQLiteDatabaseManager()
+    yield db
+    asyncio.run(db.close_pool())
+
+
+def test_merge_patch_replaces_merges_and_deletes(db):
+    async def scenario():
+        await db.upsert_profile("u1", PROFILE)
+        return await db.patch_profile("u1", {"personal_info": {"phone": None, "email": "m@example.com"}, "skills": ["Spark"]})
+
+    row = asyncio.run(scenario())
+    assert row["profile"] == {
+        "personal_info": {"full_name": "Marta Kowalska", "email": "m@example.com"},
+        "skills": ["Spark"]
+    }
+    assert row["version"] == 2
+
+
+def test_patch_with_stale_version_is_rejected(db):
+    async def scenario():
+        await db.upsert_profile("u1", PROFILE)
+        first = await db.patch_profile("u1", {"skills": ["Spark"]}, expected_version=1)
+        stale = await db.patch_profile("u1", {"skills": ["Kafka"]}, expected_version=1)
+        return first, stale, await db.get_profile("u1")
+
+    first, stale, current = asyncio.run(scenario())
+    assert first["version"] == 2 and stale is None
+    assert current["profile"]["skills"] == ["Spark"]
+
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[get_current_user] = lambda: {"id": "patch-user"}
+    asyncio.run(main.db_manager.upsert_profile("patch-user", PROFILE))
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def test_if_match_sees_edits_made_by_another_worker(client):
+    cached_etag = client.get("/profile").headers["ETag"]
+    # Another worker process patches the profile; this process still has the old row cached
+    other_worker = SQLiteDatabaseManager()
+    row = asyncio.run(other_worker.patch_profile("patch-user", {"skills": ["Spark"]}))
+    asyncio.run(other_worker.close_pool())
+    current_etag = profile_etag(row["profile"])
+
+    response = client.patch("/profile", json={"skills": ["Kafka"]}, headers={"If-Match": current_etag})
+    assert response.status_code == 200
+    assert response.json()["skills"] == ["Kafka"]
+
+    response = client.patch("/profile", json={"skills": ["Flink"]}, headers={"If-Match": cached_etag})
+    assert response.status_code == 412
+
+
+def test_get_sees_edits_made_by_another_worker(client):
+    first = client.get("/profile")
+    assert client.get("/profile", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    other_worker = SQLiteDatabaseManager()
+    asyncio.run(other_worker.patch_profile("patch-user", {"skills": ["Spark"]}))
+    asyncio.run(other_worker.close_pool())
+
+    response = client.get("/profile", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json()["skills"] == ["Spark"]
+
+
+def test_cached_profile_is_served_without_reading_the_row(db, monkeypatch):
+    asyncio.run(db.upsert_profile("u1", PROFILE))
+    asyncio.run(db.get_profile("u1"))
+
+    async def fail(user_id):
+        raise AssertionError("full row read on a cache hit")
+
+    monkeypatch.setattr(db, "_fetch_profile_row", fail)
+    assert asyncio.run(db.get_profile("u1"))["profile"] == PROFILE
@@ -0,0 +1,27 @@
+import asyncio
+
+from conftest import corpus_markdown
+from generation import HTML_PREVIEW_PIPELINE
+from html_pdf_generator import html_pdf_generator
+from pipeline import GenerationContext
+
+PROFILE = {"personal_info": {"full_name": "Marta Kowalska", "email": "marta@example.com"}}
+
+
+def render_html(markdown: str) -> str:
+    ctx = asyncio.run(HTML_PREVIEW_PIPELINE.run(GenerationContext(user_id="u1", profile=PROFILE, markdown=markdown)))
+    return ctx.html
+
+
+def test_same_markdown_gives_same_object_key():
+    markdown = corpus_markdown("data_engineer_standard")
+    first = html_pdf_generator.content_key(render_html(markdown))
+    second = html_pdf_generator.content_key(render_html(markdown))
+    assert first == second
+
+
+def test_different_input_gives_different_object_key():
+    html = render_html(corpus_markdown("data_engineer_standard"))
+    other = render_html(corpus_markdown("product_manager_bullets"))
+    assert html_pdf_generator.content_key(html) != html_pdf_generator.content_key(other)
+    assert html_pdf_generator.content_key(html) != html_pdf_generator.content_key(html, {"format": "Letter"})
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from flexible_resume_processor import FlexibleResumeProcessor
+from benchmarks.parser_harness import load_corpus
+from resume_model import ExperienceEntry, StructuredResume
+
+DOCUMENTS = load_corpus()
+
+
+@pytest.mark.parametrize("doc", DOCUMENTS, ids=[doc["name"] for doc in DOCUMENTS])
+def test_parser_output_round_trips_through_the_schema(doc):
+    resume = FlexibleResumeProcessor().process_resume(doc["markdown"], doc["profile"])
+    assert StructuredResume.from_dict(resume.to_context()) == resume
+    assert StructuredResume.from_json(resume.to_json()) == resume
+    assert resume.to_context() == doc["expected"]
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError, match="unknown fields: salary"):
+        StructuredResume.from_dict({"name": "Jane", "salary": "100k"})
+
+
+def test_wrong_type_is_rejected():
+    with pytest.raises(ValueError, match="'bullets' must be a list of strings"):
+        ExperienceEntry.from_dict({"title": "Engineer", "bullets": "Built things"})
+    with pytest.raises(ValueError, match="core_skills must be an object"):
+        StructuredResume.from_json(json.dumps({"core_skills": ["Python"]}))
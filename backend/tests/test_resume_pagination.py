@@ -0,0 +1,84 @@
+import asyncio
+import base64
+import json
+import uuid
+
+import pytest
+
+from backends import decode_resume_cursor, encode_resume_cursor
+from database_sqlite import SQLiteDatabaseManager
+
+SAME_INSTANT = "2026-01-01T10:00:00.000000+00:00"
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", str(tmp_path / "resumes.db"))
+    db = SQLiteDatabaseManager()
+    yield db
+    asyncio.run(db.close_pool())
+
+
+def add_resume(db, user_id, created_at):
+    db._execute(
+        "INSERT INTO resume_metadata (id, user_id, resume_id, created_at) VALUES (?, ?, ?, ?)",
+        (str(uuid.uuid4()), user_id, str(uuid.uuid4()), created_at)
+    )
+
+
+def walk(db, user_id, limit):
+    async def scenario():
+        pages, cursor = [], None
+        while True:
+            items, cursor = await db.list_resumes_page(user_id, limit, cursor)
+            pages.append(items)
+            if cursor is None:
+                return pages
+    return asyncio.run(scenario())
+
+
+def test_pages_cover_every_row_once_newest_first(db):
+    for day in range(1, 4):
+        add_resume(db, "u1", f"2026-01-0{day}T09:00:00.000000+00:00")
+    # Rows with the same timestamp are split across pages by id
+    for _ in range(4):
+        add_resume(db, "u1", SAME_INSTANT)
+    add_resume(db, "u2", SAME_INSTANT)
+
+    pages = walk(db, "u1", limit=2)
+    rows = [row for page in pages for row in page]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert len({row["id"] for row in rows}) == 7
+    keys = [(row["created_at"], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_rows_added_while_paging_do_not_shift_pages(db):
+    for day in range(1, 6):
+        add_resume(db, "u1", f"2026-01-0{day}T09:00:00.000000+00:00")
+
+    async def scenario():
+        first, cursor = await db.list_resumes_page("u1", 2)
+        add_resume(db, "u1", "2026-02-01T09:00:00.000000+00:00")
+        second, _ = await db.list_resumes_page("u1", 2, cursor)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert [row["created_at"][:10] for row in first + second] == [
+        "2026-01-05", "2026-01-04", "2026-01-03", "2026-01-02"
+    ]
+
+
+def test_cursor_round_trip():
+    row_id = str(uuid.uuid4())
+    assert decode_resume_cursor(encode_resume_cursor(SAME_INSTANT, row_id)) == (SAME_INSTANT, row_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    base64.urlsafe_b64encode(b'["2026-01-01", "not-a-uuid"]').decode(),
+    base64.urlsafe_b64encode(json.dumps(["2026-01-01),id.gt.(0", str(uuid.uuid4())]).encode()).decode(),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_resume_cursor(cursor)
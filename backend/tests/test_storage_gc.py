@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from backends import STORAGE_GC_GRACE_SECONDS
+from local_storage import LocalStorageManager
+
+OLD = "a" * 64
+YOUNG = "b" * 64
+KEPT = "c" * 64
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_STORAGE_DIR", str(tmp_path))
+    return LocalStorageManager()
+
+
+def store(storage, name, age=0.0):
+    asyncio.run(storage.upload_pdf(b"%PDF-", "u1", name))
+    path = storage._full_path(storage.get_object_path("u1", name))
+    written = time.time() - age
+    os.utime(path, (written, written))
+    return path
+
+
+def test_collects_only_old_unreferenced_objects(storage):
+    old = store(storage, OLD, STORAGE_GC_GRACE_SECONDS + 60)
+    young = store(storage, YOUNG)
+    kept = store(storage, KEPT, STORAGE_GC_GRACE_SECONDS + 60)
+    legacy = store(storage, "resume-1", STORAGE_GC_GRACE_SECONDS + 60)
+
+    async def referenced():
+        return {KEPT}
+
+    assert asyncio.run(storage.collect_garbage("u1", referenced)) == 1
+    assert not os.path.exists(old)
+    assert all(os.path.exists(path) for path in (young, kept, legacy))
+
+
+def test_object_referenced_during_collection_is_kept(storage):
+    path = store(storage, OLD, STORAGE_GC_GRACE_SECONDS + 60)
+    calls = []
+
+    async def referenced():
+        # A request saves a reference after GC has listed the bucket
+        calls.append(1)
+        return set() if len(calls) == 1 else {OLD}
+
+    assert asyncio.run(storage.collect_garbage("u1", referenced)) == 0
+    assert os.path.exists(path)
+
+
+def test_objects_near_the_grace_window_are_uploaded_again(storage):
+    store(storage, OLD, STORAGE_GC_GRACE_SECONDS / 2 + 60)
+    store(storage, YOUNG)
+    assert not asyncio.run(storage.object_reusable(storage.get_object_path("u1", OLD)))
+    assert asyncio.run(storage.object_reusable(storage.get_object_path("u1", YOUNG)))
+    assert not asyncio.run(storage.object_reusable(storage.get_object_path("u1", KEPT)))
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_current_user
+from conftest import corpus_markdown
+
+PROFILE = {"personal_info": {"full_name": "Marta Kowalska", "title": "Staff Data Engineer", "email": "marta@example.com"}}
+JOB_DESCRIPTION = "Senior data engineer to build streaming pipelines on Spark, Airflow and Kubernetes."
+
+
+@pytest.fixture
+def client(monkeypatch):
+    markdown = corpus_markdown("data_engineer_standard")
+
+    async def fake_agent_stream(profile_json, job_description):
+        for i in range(0, len(markdown), 50):
+            yield markdown[i:i + 50]
+
+    parses = []
+
+    async def counting_parse(markdown, profile):
+        parses.append(markdown)
+        return await original_parse(markdown, profile)
+
+    original_parse = main.parse_resume
+    monkeypatch.setattr(main, "run_agent_stream", fake_agent_stream)
+    monkeypatch.setattr(main, "parse_resume", counting_parse)
+    main.app.dependency_overrides[get_current_user] = lambda: {"id": "u1"}
+    yield TestClient(main.app), parses
+    main.app.dependency_overrides.clear()
+
+
+def test_stream_ends_with_executor_parse_and_profile_override(client):
+    http, parses = client
+    response = http.post("/generate-resume-agent/stream", json={"profile": PROFILE, "job_description": JOB_DESCRIPTION})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert any(line.get("section") == "header" for line in lines)
+    done = lines[-1]
+    assert done["done"] and "error" not in done
+    assert len(parses) == 1 and parses[0] == done["markdown"]
+    assert done["structured"]["name"] == "Marta Kowalska"
+    assert done["structured"]["title"] == "Staff Data Engineer"
+    assert done["structured"]["email"] == "marta@example.com"
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from upload_spool import STALE_TEMP_SECONDS, UploadSpool
+
+
+class FakeStorage:
+    is_configured = True
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.uploads = []
+
+    def get_object_path(self, user_id, object_name):
+        return f"{user_id}/{object_name}.pdf"
+
+    def get_public_url(self, file_path):
+        return f"https://storage.test/{file_path}"
+
+    async def object_reusable(self, file_path):
+        return False
+
+    async def upload_pdf(self, pdf_bytes, user_id, object_name):
+        if self.failures:
+            self.failures -= 1
+            return None
+        self.uploads.append((user_id, object_name, pdf_bytes))
+        return self.get_public_url(self.get_object_path(user_id, object_name))
+
+
+@pytest.fixture
+def spool_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setenv("UPLOAD_SPOOL_RETRY_BASE_SECONDS", "0.01")
+    monkeypatch.setenv("UPLOAD_SPOOL_WAIT_SECONDS", "2")
+    return tmp_path
+
+
+def dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def write_entry(directory, entry_id, content_hash="abc"):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{entry_id}.pdf"), "wb") as f:
+        f.write(b"%PDF-" + entry_id.encode())
+    with open(os.path.join(directory, f"{entry_id}.json"), "w") as f:
+        json.dump({"user_id": "u1", "resume_id": entry_id, "content_hash": content_hash,
+                   "attempts": 0, "created_at": time.time()}, f)
+
+
+async def drain(spool, storage, count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(storage.uploads) < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await spool.stop()
+
+
+def test_submit_uploads_and_clears_entry(spool_env):
+    storage = FakeStorage()
+    spool = UploadSpool(storage)
+
+    async def scenario():
+        result = await spool.submit(b"%PDF-1", "u1", "r1", "hash1")
+        await spool.stop()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result.uploaded and result.storage_url == "https://storage.test/u1/hash1.pdf"
+    assert storage.uploads == [("u1", "hash1", b"%PDF-1")]
+    assert os.listdir(spool.claim_dir) == []
+
+
+def test_failed_upload_is_retried(spool_env):
+    storage = FakeStorage(failures=2)
+    spool = UploadSpool(storage)
+
+    async def scenario():
+        result = await spool.submit(b"%PDF-1", "u1", "r1", "hash1")
+        await drain(spool, storage, 1)
+        return result
+
+    result = asyncio.run(scenario())
+    assert not result.uploaded
+    assert len(storage.uploads) == 1
+    assert os.listdir(spool.claim_dir) == []
+
+
+def test_upload_gives_up_after_max_attempts(spool_env, monkeypatch):
+    monkeypatch.setenv("UPLOAD_SPOOL_MAX_ATTEMPTS", "2")
+    storage = FakeStorage(failures=10)
+    spool = UploadSpool(storage)
+
+    async def scenario():
+        await spool.submit(b"%PDF-1", "u1", "r1", "hash1")
+        await asyncio.sleep(0.2)
+        await spool.stop()
+
+    asyncio.run(scenario())
+    assert storage.uploads == []
+    assert sorted(os.listdir(spool.failed_dir))[0].endswith(".json")
+    assert os.listdir(spool.claim_dir) == []
+
+
+def test_cancelled_request_abandons_upload(spool_env):
+    storage = FakeStorage()
+    spool = UploadSpool(storage)
+
+    async def scenario():
+        await spool.start()
+        # Keep the workers busy so the entry is still queued when the request is cancelled
+        for worker in spool._workers:
+            worker.cancel()
+        task = asyncio.create_task(spool.submit(b"%PDF-1", "u1", "r1", "hash1"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        uploaded = await spool._attempt(spool._queue.get_nowait())
+        await spool.stop()
+        return uploaded
+
+    assert asyncio.run(scenario()) is False
+    assert storage.uploads == []
+    assert os.listdir(spool.claim_dir) == []
+
+
+def test_start_takes_over_entries_of_dead_process(spool_env):
+    orphan_dir = os.path.join(spool_env, "claimed", str(dead_pid()))
+    write_entry(orphan_dir, "orphan")
+    with open(os.path.join(orphan_dir, "half.pdf.tmp"), "wb") as f:
+        f.write(b"%PDF-")
+    storage = FakeStorage()
+    spool = UploadSpool(storage)
+
+    async def scenario():
+        await spool.start()
+        await drain(spool, storage, 1)
+
+    asyncio.run(scenario())
+    assert [upload[1] for upload in storage.uploads] == ["abc"]
+    assert os.listdir(os.path.join(spool_env, "claimed")) == [str(os.getpid())]
+
+
+def test_start_leaves_entries_of_live_process(spool_env):
+    # The test runner's parent is alive and is not us
+    live_dir = os.path.join(spool_env, "claimed", str(os.getppid()))
+    write_entry(live_dir, "busy")
+    storage = FakeStorage()
+    spool = UploadSpool(storage)
+
+    async def scenario():
+        await spool.start()
+        await drain(spool, storage, 1, timeout=0.2)
+
+    asyncio.run(scenario())
+    assert storage.uploads == []
+    assert sorted(os.listdir(live_dir)) == ["busy.json", "busy.pdf"]
+
+
+def test_only_one_process_claims_a_shared_entry(spool_env):
+    write_entry(str(spool_env), "legacy")
+    first, second = UploadSpool(FakeStorage()), UploadSpool(FakeStorage())
+    # Both owners are alive, so neither takes over the other's directory
+    for spool, pid in ((first, os.getpid()), (second, os.getppid())):
+        spool.claim_dir = os.path.join(spool_env, "claimed", str(pid))
+        os.makedirs(spool.claim_dir)
+
+    assert first._adopt_orphans() == ["legacy"]
+    assert second._adopt_orphans() == []
+    assert sorted(os.listdir(first.claim_dir)) == ["legacy.json", "legacy.pdf"]
+
+
+def test_stale_temp_files_are_removed(spool_env):
+    stale = os.path.join(spool_env, "old.pdf.tmp")
+    fresh = os.path.join(spool_env, "new.pdf.tmp")
+    for path in (stale, fresh):
+        with open(path, "wb") as f:
+            f.write(b"%PDF-")
+    past = time.time() - STALE_TEMP_SECONDS - 1
+    os.utime(stale, (past, past))
+    spool = UploadSpool(FakeStorage())
+
+    async def scenario():
+        await spool.start()
+        await spool.stop()
+
+    asyncio.run(scenario())
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
@@ -0,0 +1,346 @@
+"""
+Durable on-disk spool for PDF uploads.
+
+Rendered PDFs are written to the spool directory first and uploaded to storage
+by background workers with exponential-backoff retries. Pending uploads survive
+a restart and are drained when the spool starts.
+
+Several processes (uvicorn workers, job_worker) share the spool directory, so
+each one writes its entries into its own claimed/<pid> directory and only
+touches those. Entries of a process that died are taken over by renaming its
+directory, which only one survivor can win. PIDs identify owners, so the
+directory must not be shared across hosts or containers.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from backend_config import storage_manager
+
+# Temp files this old in the shared directory belong to a writer that is gone
+STALE_TEMP_SECONDS = 3600
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@dataclass
+class SpoolResult:
+    storage_url: str
+    uploaded: bool
+    content_hash: str
+
+
+class UploadSpool:
+    def __init__(self, storage):
+        self.storage = storage
+        self.spool_dir = os.getenv(
+            "UPLOAD_SPOOL_DIR",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "upload_spool")
+        )
+        self.failed_dir = os.path.join(self.spool_dir, "failed")
+        self.claimed_root = os.path.join(self.spool_dir, "claimed")
+        # This process's entries; set on start() so forked workers get their own
+        self.claim_dir: Optional[str] = None
+        self.worker_count = int(os.getenv("UPLOAD_SPOOL_WORKERS", "4"))
+        self.max_attempts = int(os.getenv("UPLOAD_SPOOL_MAX_ATTEMPTS", "10"))
+        self.retry_base_delay = float(os.getenv("UPLOAD_SPOOL_RETRY_BASE_SECONDS", "1"))
+        self.retry_max_delay = float(os.getenv("UPLOAD_SPOOL_RETRY_MAX_SECONDS", "300"))
+        # How long a request waits for the first upload attempt before answering
+        self.request_wait = float(os.getenv("UPLOAD_SPOOL_WAIT_SECONDS", "10"))
+        # How often to look for entries left by processes that died
+        self.sweep_interval = float(os.getenv("UPLOAD_SPOOL_SWEEP_SECONDS", "60"))
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._first_attempts: Dict[str, asyncio.Future] = {}
+        # Entries whose request was cancelled before the upload happened
+        self._abandoned = set()
+        self._retry_handles = set()
+
+    @property
+    def pending(self) -> int:
+        """Uploads queued for a worker right now"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Start upload workers and re-queue everything left in the spool by dead processes"""
+        async with self._start_lock:
+            if self._queue is not None:
+                return
+            os.makedirs(self.failed_dir, exist_ok=True)
+            self.claim_dir = os.path.join(self.claimed_root, str(os.getpid()))
+            os.makedirs(self.claim_dir, exist_ok=True)
+
+            # Our directory can only hold entries of an earlier process with the same PID
+            leftover = await asyncio.to_thread(self._clean_dir, self.claim_dir)
+            leftover += await asyncio.to_thread(self._adopt_orphans)
+
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+            for entry_id in sorted(leftover):
+                self._queue.put_nowait(entry_id)
+            if leftover:
+                logging.info(f"Upload spool: draining {len(leftover)} pending upload(s) from previous run")
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        """Stop workers; anything not yet uploaded stays on disk for the next start"""
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        tasks = self._workers + ([self._sweeper] if self._sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._sweeper = None
+        self._queue = None
+
+    async def submit(self, pdf_bytes: bytes, user_id: str, resume_id: str, content_hash: str) -> Optional[SpoolResult]:
+        """Spool a PDF for upload under its content_hash object key and return its storage URL.
+
+        Waits up to UPLOAD_SPOOL_WAIT_SECONDS for the first upload attempt;
+        if that fails or takes longer, the URL is returned with uploaded=False
+        and the upload keeps retrying in the background.
+        """
+        if not self.storage.is_configured:
+            logging.error("Upload spool: storage not configured")
+            return None
+        if self._queue is None:
+            await self.start()
+
+        file_path = self.storage.get_object_path(user_id, content_hash)
+        storage_url = self.storage.get_public_url(file_path)
+
+        # The same render was already stored: nothing to spool or upload
+        if await self.storage.object_reusable(file_path):
+            return SpoolResult(storage_url=storage_url, uploaded=True, content_hash=content_hash)
+
+        entry_id = uuid.uuid4().hex
+        entry = {
+            "user_id": user_id,
+            "resume_id": resume_id,
+            "content_hash": content_hash,
+            "attempts": 0,
+            "created_at": time.time()
+        }
+        write = asyncio.ensure_future(asyncio.to_thread(self._write_entry, entry_id, pdf_bytes, entry))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # The write thread can't be interrupted; delete the entry once it lands
+            write.add_done_callback(lambda _: asyncio.ensure_future(asyncio.to_thread(self._remove_entry, entry_id)))
+            raise
+
+        first_attempt = asyncio.get_running_loop().create_future()
+        self._first_attempts[entry_id] = first_attempt
+        self._queue.put_nowait(entry_id)
+
+        try:
+            uploaded = await asyncio.wait_for(asyncio.shield(first_attempt), timeout=self.request_wait)
+        except asyncio.TimeoutError:
+            uploaded = False
+        except asyncio.CancelledError:
+            if not first_attempt.done():
+                self._abandoned.add(entry_id)
+            raise
+        return SpoolResult(storage_url=storage_url, uploaded=uploaded, content_hash=content_hash)
+
+    def _paths(self, entry_id: str, directory: Optional[str] = None):
+        directory = directory or self.claim_dir
+        return (
+            os.path.join(directory, f"{entry_id}.pdf"),
+            os.path.join(directory, f"{entry_id}.json")
+        )
+
+    def _claim_entry(self, directory: str, entry_id: str) -> bool:
+        """Move one entry into our directory; False if another process got it first"""
+        src_pdf, src_meta = self._paths(entry_id, directory)
+        dst_pdf, dst_meta = self._paths(entry_id)
+        # The rename of the .json file is the claim
+        try:
+            os.rename(src_meta, dst_meta)
+        except FileNotFoundError:
+            return False
+        try:
+            os.rename(src_pdf, dst_pdf)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _clean_dir(self, directory: str) -> List[str]:
+        """Delete temp files and PDFs without metadata (interrupted writes); return the complete entries"""
+        names = os.listdir(directory)
+        entries = {name[:-5] for name in names if name.endswith(".json")}
+        for name in names:
+            if name.endswith(".tmp") or (name.endswith(".pdf") and name[:-4] not in entries):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+        return list(entries)
+
+    def _adopt_orphans(self) -> List[str]:
+        """Claim entries nobody alive owns and return their ids"""
+        adopted = []
+        # Entries written straight into the spool directory by older versions
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith(".json"):
+                if self._claim_entry(self.spool_dir, name[:-5]):
+                    adopted.append(name[:-5])
+            elif name.endswith(".tmp"):
+                try:
+                    if time.time() - os.path.getmtime(path) > STALE_TEMP_SECONDS:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        own = os.path.basename(self.claim_dir)
+        for owner in os.listdir(self.claimed_root):
+            pid = owner.split("-", 1)[0]
+            if owner == own or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            # Renaming the whole directory is atomic, so exactly one process takes it over;
+            # if we die halfway, the new name still points at a dead owner
+            takeover = os.path.join(self.claimed_root, f"{own}-{uuid.uuid4().hex}")
+            try:
+                os.rename(os.path.join(self.claimed_root, owner), takeover)
+            except OSError:
+                continue
+            entries = self._clean_dir(takeover)
+            adopted += [entry_id for entry_id in entries if self._claim_entry(takeover, entry_id)]
+            try:
+                os.rmdir(takeover)
+            except OSError as e:
+                logging.warning(f"Upload spool: could not remove {takeover}: {e}")
+            logging.info(f"Upload spool: took over {len(entries)} upload(s) from dead process {pid}")
+        return adopted
+
+    async def _sweep(self):
+        """Periodically pick up entries of processes that died while we run"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                adopted = await asyncio.to_thread(self._adopt_orphans)
+            except OSError as e:
+                logging.error(f"Upload spool: sweep failed: {e}")
+                continue
+            for entry_id in adopted:
+                self._queue.put_nowait(entry_id)
+
+    def _write_entry(self, entry_id: str, pdf_bytes: bytes, entry: dict):
+        """Write PDF then metadata atomically; the .json file marks the entry as complete"""
+        pdf_path, meta_path = self._paths(entry_id)
+        with open(pdf_path + ".tmp", "wb") as f:
+            f.write(pdf_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pdf_path + ".tmp", pdf_path)
+        self._write_meta(meta_path, entry)
+
+    def _write_meta(self, meta_path: str, entry: dict):
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _read_entry(self, entry_id: str):
+        pdf_path, meta_path = self._paths(entry_id)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+        return entry, pdf_bytes
+
+    def _remove_entry(self, entry_id: str):
+        for path in self._paths(entry_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _move_to_failed(self, entry_id: str):
+        for path in self._paths(entry_id):
+            if os.path.exists(path):
+                os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+
+    async def _worker(self):
+        while True:
+            entry_id = await self._queue.get()
+            try:
+                uploaded = await self._attempt(entry_id)
+            except Exception as e:
+                logging.error(f"Upload spool: unexpected error for {entry_id}: {e}")
+                uploaded = False
+            finally:
+                self._queue.task_done()
+
+            first_attempt = self._first_attempts.pop(entry_id, None)
+            if first_attempt and not first_attempt.done():
+                first_attempt.set_result(uploaded)
+
+    async def _attempt(self, entry_id: str) -> bool:
+        """Try to upload one spooled entry, scheduling a retry on failure"""
+        if entry_id in self._abandoned:
+            # Nobody will reference this PDF; an upload already in flight is left to storage GC
+            self._abandoned.discard(entry_id)
+            await asyncio.to_thread(self._remove_entry, entry_id)
+            logging.info(f"Upload spool: dropped {entry_id}, request was cancelled")
+            return False
+
+        try:
+            entry, pdf_bytes = await asyncio.to_thread(self._read_entry, entry_id)
+        except FileNotFoundError:
+            logging.warning(f"Upload spool: entry {entry_id} is incomplete, dropping it")
+            await asyncio.to_thread(self._remove_entry, entry_id)
+            return False
+
+        # Entries spooled before content addressing are stored under their resume_id
+        object_name = entry.get("content_hash") or entry["resume_id"]
+        storage_url = await self.storage.upload_pdf(pdf_bytes, entry["user_id"], object_name)
+        if storage_url:
+            self._abandoned.discard(entry_id)
+            await asyncio.to_thread(self._remove_entry, entry_id)
+            if entry["attempts"]:
+                logging.info(f"Upload spool: {entry['resume_id']} uploaded after {entry['attempts'] + 1} attempts")
+            return True
+
+        entry["attempts"] += 1
+        if entry["attempts"] >= self.max_attempts:
+            logging.error(f"Upload spool: giving up on {entry['resume_id']} after {entry['attempts']} attempts")
+            await asyncio.to_thread(self._move_to_failed, entry_id)
+            return False
+
+        await asyncio.to_thread(self._write_meta, self._paths(entry_id)[1], entry)
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (entry["attempts"] - 1)))
+        logging.warning(f"Upload spool: upload of {entry['resume_id']} failed, retry {entry['attempts']} in {delay:.0f}s")
+        self._schedule_retry(entry_id, delay)
+        return False
+
+    def _schedule_retry(self, entry_id: str, delay: float):
+        queue = self._queue
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            queue.put_nowait(entry_id)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+
+# Global instance
+upload_spool = UploadSpool(storage_manager)